@@ -0,0 +1,315 @@
+import numpy as np
+import pandas as pd
+from keyword_detector import get_theme_registry, THEME_MASK_COLUMN
+from rules import (RATINGS, SENTIMENTS, RULE_TABLES, EXPECTED_SENTIMENT, DEFAULT_EXPECTED_SENTIMENT, rating_codes,
+                   sentiment_codes)
+
+# Cubo de agregados mescláveis da análise (nota × sentimento × tema, histogramas exatos
+# de confiança), montado em uma única passada: todos os gráficos são desenhados a partir
+# dele, com custo independente do número de reviews.
+
+# confidence_percent tem duas casas decimais (0.00 a 100.00): um bin por valor possível
+CONFIDENCE_BINS = 10001
+
+# Notas consideradas na matriz de confusão (a nota 3 fica de fora)
+CONFUSION_RATINGS = [1, 2, 4, 5]
+
+# Semente das chaves do sorteio de uma review por grupo (reservatório dos agregados)
+REVIEW_SAMPLE_SEED = 42
+
+def empty_aggregates():
+    n_themes = len(get_theme_registry())
+    shape = (len(RATINGS), len(SENTIMENTS))
+    return {
+        "rows": 0,
+        "counts": np.zeros(shape, dtype=np.int64),
+        "confidence_hist": np.zeros(shape + (CONFIDENCE_BINS,), dtype=np.int64),
+        "confidence_sum": np.zeros(shape, dtype=np.float64),
+        "confidence_sq_sum": np.zeros(shape, dtype=np.float64),
+        "theme_counts": np.zeros(shape + (n_themes,), dtype=np.int64),
+        # Reservatório de uma review por grupo: menor chave sorteada e a posição da sua linha
+        "sample_keys": np.full(shape, np.inf),
+        "sample_rows": np.full(shape, -1, dtype=np.int64),
+    }
+
+# Índice (nota, sentimento) de cada linha; -1 para notas fora de 1-5
+def group_index(df):
+    ratings = rating_codes(df["class_index"]).astype(np.int64)
+    sentiments = sentiment_codes(df["sentiment_class"]).astype(np.int64)
+    valid = (ratings >= 0) & (sentiments >= 0)
+    return np.where(valid, ratings * len(SENTIMENTS) + sentiments, -1)
+
+# Chaves aleatórias das linhas [start, start + count) do fluxo de semente fixa: a chave de
+# uma linha depende só da sua posição, então blocos analisados em sequência dão as mesmas
+# chaves que o dataframe inteiro
+def sample_keys(start, count, seed=REVIEW_SAMPLE_SEED):
+    bit_generator = np.random.PCG64(seed)
+    bit_generator.advance(start)
+    return np.random.Generator(bit_generator).random(count)
+
+# Menor chave de cada grupo e a primeira linha (posição local) que a tem
+def _group_minimum(groups, keys):
+    valid = groups >= 0
+    best = np.full(len(RATINGS) * len(SENTIMENTS), np.inf)
+    np.minimum.at(best, groups[valid], keys[valid])
+    chosen = np.flatnonzero(valid & (keys == best[np.where(valid, groups, 0)]))
+    present, first = np.unique(groups[chosen], return_index=True)
+    rows = np.full(best.size, -1, dtype=np.int64)
+    rows[present] = chosen[first]
+    return best, rows
+
+# Uma linha sorteada por grupo (nota, sentimento), em posições na ordem dos grupos.
+# Cada linha recebe uma chave aleatória de semente fixa e fica a de menor chave do grupo:
+# amostragem por reservatório por grupo em uma passada, determinística (o mesmo dataset,
+# na mesma ordem, sempre dá as mesmas linhas, e linhas acrescentadas não mudam as chaves).
+# O mesmo reservatório é montado com os agregados (build_aggregates/merge_aggregates);
+# esta versão percorre df inteiro e serve para dataframes sem agregados correspondentes.
+def group_sample_positions(df, seed=REVIEW_SAMPLE_SEED):
+    _, rows = _group_minimum(group_index(df), sample_keys(0, len(df), seed))
+    return rows[rows >= 0]
+
+# Posições (na ordem dos grupos) das reviews do reservatório dos agregados, no dataframe de
+# rows linhas que os originou. None quando os agregados não descrevem esse dataframe inteiro
+# (ex.: amostra de um arquivo maior) ou não têm o reservatório (ex.: lidos do banco).
+def sample_positions(agg, rows):
+    chosen = agg["sample_rows"].ravel()
+    present = agg["counts"].ravel() > 0
+    if agg["rows"] != rows or (chosen[present] < 0).any():
+        return None
+    return chosen[present]
+
+# Pares (linha, bit do tema) a partir da bitmask de temas ou das colunas de listas
+def theme_bits(df):
+    registry = get_theme_registry()
+    rows, bits = [], []
+    if THEME_MASK_COLUMN in df:
+        masks = df[THEME_MASK_COLUMN].to_numpy(dtype=np.uint32)
+        for bit in range(len(registry)):
+            bit_rows = np.flatnonzero(masks >> np.uint32(bit) & np.uint32(1))
+            rows.append(bit_rows)
+            bits.append(np.full(len(bit_rows), bit, dtype=np.int64))
+        return np.concatenate(rows), np.concatenate(bits)
+    for column in ("themes", "positive_themes"):
+        if column not in df:
+            continue
+        bit_of = {theme: bit for bit, (col, theme) in enumerate(registry) if col == column}
+        exploded = df[column].reset_index(drop=True).explode().dropna()
+        rows.append(exploded.index.to_numpy())
+        bits.append(exploded.map(bit_of).to_numpy(dtype=np.int64))
+    if not rows:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    return np.concatenate(rows), np.concatenate(bits)
+
+# row_offset: posição da primeira linha de df no dataframe analisado completo (blocos)
+def build_aggregates(df, row_offset=0):
+    agg = empty_aggregates()
+    n_groups = agg["counts"].size
+    n_themes = agg["theme_counts"].shape[-1]
+    agg["rows"] = len(df)
+    if df.empty:
+        return agg
+
+    groups = group_index(df)
+    valid = groups >= 0
+    valid_groups = groups[valid]
+    confidence_bins = np.rint(df["confidence_percent"].to_numpy(dtype=np.float64)[valid] * 100).astype(np.int64)
+    # Valores exatos a partir do bin
+    confidence = confidence_bins / 100
+
+    agg["counts"] += np.bincount(valid_groups, minlength=n_groups).reshape(agg["counts"].shape)
+    agg["confidence_hist"] += np.bincount(
+        valid_groups * CONFIDENCE_BINS + confidence_bins, minlength=n_groups * CONFIDENCE_BINS
+    ).reshape(agg["confidence_hist"].shape)
+    agg["confidence_sum"] += np.bincount(valid_groups, weights=confidence, minlength=n_groups).reshape(agg["counts"].shape)
+    agg["confidence_sq_sum"] += np.bincount(valid_groups, weights=confidence ** 2, minlength=n_groups).reshape(agg["counts"].shape)
+
+    theme_rows, row_bits = theme_bits(df)
+    theme_groups = groups[theme_rows]
+    keep = theme_groups >= 0
+    agg["theme_counts"] += np.bincount(
+        theme_groups[keep] * n_themes + row_bits[keep], minlength=n_groups * n_themes
+    ).reshape(agg["theme_counts"].shape)
+
+    best, chosen = _group_minimum(groups, sample_keys(row_offset, len(df)))
+    agg["sample_keys"] = best.reshape(agg["sample_keys"].shape)
+    agg["sample_rows"] = np.where(chosen >= 0, chosen + row_offset, -1).reshape(agg["sample_rows"].shape)
+    return agg
+
+# Somas campo a campo; no reservatório fica, em cada grupo, a linha de menor chave
+# (no empate, a da esquerda, que vem antes no dataframe)
+def merge_aggregates(left, right):
+    merged = {key: left[key] + right[key] for key in left if key not in ("sample_keys", "sample_rows")}
+    take_right = right["sample_keys"] < left["sample_keys"]
+    merged["sample_keys"] = np.where(take_right, right["sample_keys"], left["sample_keys"])
+    merged["sample_rows"] = np.where(take_right, right["sample_rows"], left["sample_rows"])
+    return merged
+
+# Mesma série de df["class_index"].value_counts().sort_index()
+def class_counts(agg):
+    counts = pd.Series(agg["counts"].sum(axis=1), index=pd.Index(RATINGS, name="class_index"), name="count")
+    return counts[counts > 0]
+
+# Mesma série de df["sentiment_class"].value_counts()
+def sentiment_counts(agg):
+    counts = pd.Series(agg["counts"].sum(axis=0), index=pd.Index(SENTIMENTS, name="sentiment_class"), name="count")
+    return counts[counts > 0].sort_values(ascending=False, kind="stable")
+
+# Mesma tabela de pd.crosstab(df["class_index"], df["sentiment_class"])
+def crosstab(agg):
+    table = pd.DataFrame(
+        agg["counts"],
+        index=pd.Index(RATINGS, name="class_index"),
+        columns=pd.Index(SENTIMENTS, name="sentiment_class"),
+    )
+    table = table.loc[table.sum(axis=1) > 0, table.sum(axis=0) > 0]
+    return table[sorted(table.columns)]
+
+# Contagem de temas de uma coluna entre as reviews de um sentimento (gráficos de pizza)
+def theme_counts(agg, sentiment_class, theme_column):
+    registry = get_theme_registry()
+    bits = [bit for bit, (column, _) in enumerate(registry) if column == theme_column]
+    counts = agg["theme_counts"][:, SENTIMENTS.index(sentiment_class), bits].sum(axis=0)
+    series = pd.Series(counts, index=[registry[bit][1] for bit in bits], name="count")
+    series.index.name = theme_column
+    return series[series > 0].sort_values(ascending=False, kind="stable")
+
+# Percentis (interpolação linear, como np.percentile) a partir de um histograma de confiança
+def _histogram_percentiles(counts, percentiles):
+    cumulative = np.cumsum(counts)
+    total = cumulative[-1]
+    values = []
+    for percentile in percentiles:
+        position = (total - 1) * percentile / 100
+        lower = int(np.floor(position))
+        lower_bin = np.searchsorted(cumulative, lower, side="right")
+        upper_bin = np.searchsorted(cumulative, min(lower + 1, total - 1), side="right")
+        values.append((lower_bin + (position - lower) * (upper_bin - lower_bin)) / 100)
+    return values
+
+# Histograma de confiança, soma e rótulos por nota ("rating") ou por sentimento ("sentiment")
+def _confidence_groups(agg, by):
+    if by == "rating":
+        return agg["confidence_hist"].sum(axis=1), agg["confidence_sum"].sum(axis=1), RATINGS
+    return agg["confidence_hist"].sum(axis=0), agg["confidence_sum"].sum(axis=0), SENTIMENTS
+
+# Estatísticas de boxplot da confiança para ax.bxp (quartis e bigodes de 1,5 IQR, como no
+# matplotlib), sem percorrer as linhas. Os outliers vêm como valores distintos.
+def confidence_box_stats(agg, by="rating", whis=1.5, fliers=False):
+    hist, sums, labels = _confidence_groups(agg, by)
+    values = np.arange(CONFIDENCE_BINS) / 100
+    stats = []
+    for i, label in enumerate(labels):
+        total = hist[i].sum()
+        if total == 0:
+            continue
+        q1, median, q3 = _histogram_percentiles(hist[i], [25, 50, 75])
+        present = values[hist[i] > 0]
+        iqr = q3 - q1
+        low, high = q1 - whis * iqr, q3 + whis * iqr
+        stats.append({
+            "label": label,
+            "q1": q1,
+            "med": median,
+            "q3": q3,
+            "whislo": present[present >= low].min(),
+            "whishi": present[present <= high].max(),
+            "mean": sums[i] / total,
+            "fliers": present[(present < low) | (present > high)] if fliers else [],
+        })
+    return stats
+
+# Mesma série de pd.cut(df["confidence_percent"], bins, labels, include_lowest=True).value_counts().sort_index()
+def confidence_range_counts(agg, bins, labels):
+    hist = agg["confidence_hist"].sum(axis=(0, 1))
+    values = np.arange(CONFIDENCE_BINS) / 100
+    ranges = pd.cut(values, bins=bins, labels=labels, include_lowest=True)
+    counts = pd.Series(hist, index=ranges).groupby(level=0, observed=False).sum()
+    counts.index.name = "confidence_range"
+    return counts.rename("count")
+
+# Valores distintos de confiança e quantas reviews têm cada um (para histogramas ponderados)
+def confidence_values(agg):
+    hist = agg["confidence_hist"].sum(axis=(0, 1))
+    present = np.flatnonzero(hist)
+    return present / 100, hist[present]
+
+# Mesma tabela de df.groupby(["class_index", "sentiment_class"]) com count e média de confiança
+def group_summary(agg):
+    rows = [
+        {
+            "class_index": rating,
+            "sentiment_class": sentiment,
+            "count": int(agg["counts"][i, j]),
+            "avg_confidence": agg["confidence_sum"][i, j] / agg["counts"][i, j],
+        }
+        for i, rating in enumerate(RATINGS)
+        for j, sentiment in enumerate(SENTIMENTS)
+        if agg["counts"][i, j] > 0
+    ]
+    summary = pd.DataFrame(rows, columns=["class_index", "sentiment_class", "count", "avg_confidence"])
+    return summary.sort_values(["class_index", "sentiment_class"], ignore_index=True)
+
+# Mesma tabela de df.groupby("class_index")["confidence_percent"].agg(["mean", "median", "std", "min", "max"])
+def confidence_stats_by_rating(agg):
+    hist = agg["confidence_hist"].sum(axis=1)
+    totals = hist.sum(axis=1)
+    sums = agg["confidence_sum"].sum(axis=1)
+    sq_sums = agg["confidence_sq_sum"].sum(axis=1)
+    rows = {}
+    for i, rating in enumerate(RATINGS):
+        total = totals[i]
+        if total == 0:
+            continue
+        mean = sums[i] / total
+        variance = (sq_sums[i] - total * mean ** 2) / (total - 1) if total > 1 else float("nan")
+        present = np.flatnonzero(hist[i]) / 100
+        rows[rating] = {
+            "mean": mean,
+            "median": _histogram_percentiles(hist[i], [50])[0],
+            "std": np.sqrt(max(variance, 0.0)) if total > 1 else float("nan"),
+            "min": present[0],
+            "max": present[-1],
+        }
+    stats = pd.DataFrame.from_dict(rows, orient="index", columns=["mean", "median", "std", "min", "max"])
+    stats.index.name = "class_index"
+    return stats
+
+def mean_confidence(agg):
+    counts = agg["counts"].sum()
+    return agg["confidence_sum"].sum() / counts if counts else float("nan")
+
+# Mesma precisão de calculate_precision: acertos / total de linhas
+def precision(agg):
+    if agg["rows"] == 0:
+        return float("nan")
+    accepted = RULE_TABLES["precision"][:len(RATINGS), :len(SENTIMENTS)]
+    return agg["counts"][accepted].sum() / agg["rows"]
+
+def _safe_ratio(numerator, denominator):
+    # Mesmo comportamento do sklearn (zero_division): 0.0 quando o denominador é zero
+    return float(numerator / denominator) if denominator else 0.0
+
+def _binary_metrics(true_positive, false_positive, false_negative):
+    precision_value = _safe_ratio(true_positive, true_positive + false_positive)
+    recall_value = _safe_ratio(true_positive, true_positive + false_negative)
+    f1_value = _safe_ratio(2 * precision_value * recall_value, precision_value + recall_value)
+    return {"precision": precision_value, "recall": recall_value, "f1": f1_value}
+
+# Matriz de confusão (esperado × detectado, ordem de SENTIMENTS) das notas 1, 2, 4 e 5
+def confusion_matrix(agg):
+    cm = np.zeros((len(SENTIMENTS), len(SENTIMENTS)), dtype=np.int64)
+    for rating in CONFUSION_RATINGS:
+        expected = EXPECTED_SENTIMENT.get(rating, DEFAULT_EXPECTED_SENTIMENT)
+        cm[SENTIMENTS.index(expected)] += agg["counts"][RATINGS.index(rating)]
+    return cm
+
+# Métricas binárias das notas 1 e 5 (Positivo e Negativo como classe positiva)
+def model_metrics(agg):
+    counts = agg["counts"]
+    five = counts[RATINGS.index(5)]
+    one = counts[RATINGS.index(1)]
+    positive, negative = SENTIMENTS.index("Positivo"), SENTIMENTS.index("Negativo")
+    return {
+        "Positivo": _binary_metrics(five[positive], one[positive], five.sum() - five[positive]),
+        "Negativo": _binary_metrics(one[negative], five[negative], one.sum() - one[negative]),
+    }
@@ -0,0 +1,80 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+# Cliente da API de linhas do HuggingFace (sem dependência do Streamlit)
+API_URL = "https://datasets-server.huggingface.co/rows"
+DATASET_PARAMS = {
+    "dataset": "yassiracharki/Amazon_Reviews_for_Sentiment_Analysis_fine_grained_5_classes",
+    "config": "default",
+    "split": "train",
+}
+
+# A API devolve no máximo 100 linhas por requisição
+MAX_PAGE_SIZE = 100
+DEFAULT_TIMEOUT = 10
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF = 0.5
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+REVIEW_COLUMNS = ["review_title", "review_text", "class_index"]
+
+# Sessão com pool de conexões reaproveitadas entre as requisições
+def create_session(pool_size=DEFAULT_MAX_WORKERS):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def rows_to_records(data):
+    return [{column: item["row"][column] for column in REVIEW_COLUMNS} for item in data["rows"]]
+
+def _retry_delay(response, attempt, backoff):
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    return backoff * (2 ** attempt)
+
+# Uma página com timeout e novas tentativas (backoff exponencial) em 429/5xx e falhas de rede
+def fetch_page(session, offset, limit, base_url=API_URL, timeout=DEFAULT_TIMEOUT,
+               max_retries=DEFAULT_MAX_RETRIES, backoff=DEFAULT_BACKOFF):
+    params = dict(DATASET_PARAMS, offset=offset, limit=limit)
+    for attempt in range(max_retries + 1):
+        response = None
+        try:
+            response = session.get(base_url, params=params, timeout=timeout)
+            if response.status_code not in RETRY_STATUS:
+                response.raise_for_status()
+                return rows_to_records(response.json())
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == max_retries:
+                raise
+        if attempt == max_retries:
+            response.raise_for_status()
+        time.sleep(_retry_delay(response, attempt, backoff))
+
+# Baixa as linhas [start, stop) em páginas paralelas (concorrência limitada) e
+# devolve um DataFrame na ordem dos offsets.
+def fetch_range(start, stop, page_size=MAX_PAGE_SIZE, max_workers=DEFAULT_MAX_WORKERS,
+                timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES, backoff=DEFAULT_BACKOFF,
+                base_url=API_URL, session=None):
+    page_size = min(page_size, MAX_PAGE_SIZE)
+    offsets = range(start, stop, page_size)
+    own_session = session is None
+    session = session or create_session(max_workers)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pages = executor.map(
+                lambda offset: fetch_page(session, offset, min(page_size, stop - offset), base_url,
+                                          timeout, max_retries, backoff),
+                offsets
+            )
+            records = [record for page in pages for record in page]
+    finally:
+        if own_session:
+            session.close()
+    return pd.DataFrame(records, columns=REVIEW_COLUMNS)
@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from preprocessor import preprocess_series, tokenize_series
+from sentiment_analyzer import compute_scores, calculate_precision, analyze_sentiment
+from keyword_detector import detect_keywords, detect_themes, get_negative_keywords, get_positive_keywords
+
+SAMPLE_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "amazon_reviews.csv")
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "benchmark_baseline.json")
+
+SUITE_SIZES = [1_000, 100_000, 1_000_000]
+# Variação tolerada antes de sinalizar regressão (20% menos vazão ou 20% mais memória)
+DEFAULT_TOLERANCE = 0.2
+
+# Corpus sintético com o mesmo formato de data/amazon_reviews.csv.
+# Cada review combina frases de reviews reais para que os textos não se repitam.
+def make_synthetic_reviews(n_rows, seed=42):
+    base = pd.read_csv(SAMPLE_CSV_PATH)
+    rng = np.random.default_rng(seed)
+    sentences = [s.strip() for text in base["review_text"] for s in text.split(".") if s.strip()]
+    sentences = np.array(sentences, dtype=object)
+    counts = rng.integers(2, 7, size=n_rows)
+    picks = rng.integers(0, len(sentences), size=counts.sum())
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+    texts = [". ".join(sentences[picks[bounds[i]:bounds[i + 1]]]) + "." for i in range(n_rows)]
+    rows = base.sample(n=n_rows, replace=True, random_state=seed).reset_index(drop=True)
+    rows["review_text"] = texts
+    return rows
+
+def _throughput(n_rows, seconds):
+    return n_rows / seconds if seconds > 0 else float("inf")
+
+# Escalabilidade do modo paralelo de analyze_sentiment: 1 até N workers
+def benchmark_parallel_scoring(n_rows, max_workers, chunk_size):
+    texts = preprocess_series(make_synthetic_reviews(n_rows)["review_text"]).tolist()
+    results = []
+    for workers in range(1, max_workers + 1):
+        start = time.perf_counter()
+        compute_scores(texts, workers=workers, chunk_size=chunk_size)
+        elapsed = time.perf_counter() - start
+        results.append({"workers": workers, "seconds": elapsed, "rows_per_second": _throughput(n_rows, elapsed)})
+    return results
+
+# Detecção de temas: laço original (palavra-chave por palavra-chave) vs autômato único
+def benchmark_theme_matching(sizes):
+    negative_keywords = get_negative_keywords()
+    positive_keywords = get_positive_keywords()
+    results = []
+    for n_rows in sizes:
+        df = make_synthetic_reviews(n_rows)
+        df["clean_text"] = preprocess_series(df["review_text"])
+
+        start = time.perf_counter()
+        df["clean_text"].apply(lambda x: detect_keywords(x, negative_keywords))
+        df["clean_text"].apply(lambda x: detect_keywords(x, positive_keywords))
+        loop_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        detect_themes(df)
+        automaton_seconds = time.perf_counter() - start
+
+        results.append({
+            "rows": n_rows,
+            "loop_seconds": loop_seconds,
+            "automaton_seconds": automaton_seconds,
+            "speedup": loop_seconds / automaton_seconds,
+        })
+    return results
+
+# Etapas do pipeline na ordem de execução; cada uma recebe o dataframe da etapa anterior
+def _stage_preprocess(df, state):
+    df["clean_text"], state["tokens"] = tokenize_series(df["review_text"])
+
+def _stage_sentiment(df, state):
+    analyze_sentiment(df, preprocessed=True)
+
+def _stage_precision(df, state):
+    state["precision"] = calculate_precision(df)
+
+def _stage_themes(df, state):
+    detect_themes(df, state["tokens"])
+
+# Importações de Streamlit/matplotlib feitas antes da medição da etapa de renderização
+def _prepare_render():
+    import logging
+    import matplotlib
+    matplotlib.use("Agg")
+    # Streamlit fora de "streamlit run" (modo bare) só emite avisos; os gráficos são gerados normalmente
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    import visualization  # noqa: F401
+
+# Renderização a frio: o cache de figuras é esvaziado antes de cada medição
+def _stage_render(df, state):
+    import figure_cache
+    from visualization import display_visualizations
+
+    figure_cache.clear()
+    display_visualizations(df, state["precision"])
+
+SUITE_STAGES = {
+    "preprocess_text": _stage_preprocess,
+    "analyze_sentiment": _stage_sentiment,
+    "calculate_precision": _stage_precision,
+    "detect_themes": _stage_themes,
+    "display_visualizations": _stage_render,
+}
+
+# Mede uma etapa duas vezes: tempo sem rastreamento e pico de memória com tracemalloc
+def _measure_stage(stage, df, state, measure_memory):
+    start = time.perf_counter()
+    stage(df, state)
+    seconds = time.perf_counter() - start
+
+    peak_mb = None
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            stage(df, state)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return seconds, peak_mb
+
+def run_suite(sizes, stages, measure_memory=True):
+    if "display_visualizations" in stages:
+        _prepare_render()
+    results = []
+    for n_rows in sizes:
+        df = make_synthetic_reviews(n_rows)
+        state = {}
+        for name, stage in SUITE_STAGES.items():
+            if name not in stages:
+                # As etapas seguintes dependem das colunas desta, então ela roda sem ser medida
+                stage(df, state)
+                continue
+            seconds, peak_mb = _measure_stage(stage, df, state, measure_memory)
+            results.append({
+                "stage": name,
+                "rows": n_rows,
+                "seconds": seconds,
+                "rows_per_second": _throughput(n_rows, seconds),
+                "peak_memory_mb": peak_mb,
+            })
+            print(f"{name:>24} {n_rows:>10} {seconds:>10.2f}s {_throughput(n_rows, seconds):>12.0f} linhas/s", file=sys.stderr)
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+# Compara com o baseline: vazão menor ou memória maior que a tolerância é regressão
+def compare_with_baseline(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    reference = {(r["stage"], r["rows"]): r for r in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        base = reference.get((result["stage"], result["rows"]))
+        if base is None:
+            continue
+        if result["rows_per_second"] < base["rows_per_second"] * (1 - tolerance):
+            regressions.append({**result, "metric": "rows_per_second", "baseline": base["rows_per_second"]})
+        if (result["peak_memory_mb"] is not None and base.get("peak_memory_mb")
+                and result["peak_memory_mb"] > base["peak_memory_mb"] * (1 + tolerance)):
+            regressions.append({**result, "metric": "peak_memory_mb", "baseline": base["peak_memory_mb"]})
+    return regressions
+
+def _print_results(results):
+    baseline = results[0]["seconds"]
+    print(f"{'workers':>8} {'segundos':>10} {'linhas/s':>12} {'speedup':>8}")
+    for r in results:
+        print(f"{r['workers']:>8} {r['seconds']:>10.2f} {r['rows_per_second']:>12.0f} {baseline / r['seconds']:>8.2f}")
+
+def _print_theme_results(results):
+    print(f"{'linhas':>10} {'laço (s)':>10} {'autômato (s)':>13} {'speedup':>8}")
+    for r in results:
+        print(f"{r['rows']:>10} {r['loop_seconds']:>10.2f} {r['automaton_seconds']:>13.2f} {r['speedup']:>8.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline de análise de sentimento")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    parallel = subparsers.add_parser("paralelo", help="Escalabilidade do scoring VADER com 1..N workers")
+    parallel.add_argument("--rows", type=int, default=100_000)
+    parallel.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parallel.add_argument("--chunk-size", type=int, default=5_000)
+
+    themes = subparsers.add_parser("temas", help="Laço de palavras-chave vs autômato de Aho–Corasick")
+    themes.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+
+    suite = subparsers.add_parser("suite", help="Vazão e pico de memória de cada etapa do pipeline")
+    suite.add_argument("--sizes", type=int, nargs="+", default=SUITE_SIZES)
+    suite.add_argument("--stages", nargs="+", choices=list(SUITE_STAGES), default=list(SUITE_STAGES))
+    suite.add_argument("--output", default="benchmark_results.json", help="Arquivo JSON com os resultados")
+    suite.add_argument("--baseline", default=BASELINE_PATH, help="Baseline para comparação")
+    suite.add_argument("--save-baseline", action="store_true", help="Grava os resultados como novo baseline")
+    suite.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    suite.add_argument("--no-memory", action="store_true", help="Não mede pico de memória (mais rápido)")
+
+    args = parser.parse_args()
+    if args.benchmark == "paralelo":
+        _print_results(benchmark_parallel_scoring(args.rows, args.max_workers, args.chunk_size))
+    elif args.benchmark == "temas":
+        _print_theme_results(benchmark_theme_matching(args.sizes))
+    elif args.benchmark == "suite":
+        report = run_suite(args.sizes, args.stages, measure_memory=not args.no_memory)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        if args.save_baseline:
+            with open(args.baseline, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+        elif os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                regressions = compare_with_baseline(report, json.load(f), args.tolerance)
+            for r in regressions:
+                print(f"REGRESSÃO {r['stage']} ({r['rows']} linhas): {r['metric']} {r[r['metric']]:.2f} "
+                      f"vs baseline {r['baseline']:.2f}")
+            if regressions:
+                sys.exit(1)
+            print("Nenhuma regressão em relação ao baseline.")
+
+
+if __name__ == "__main__":
+    main()
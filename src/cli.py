@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import sys
+import aggregates as agg_views
+from pipeline import (analyze_reviews, iter_csv_chunks, fetch_and_analyze, DEFAULT_STREAM_CHUNK_SIZE,
+                      DEFAULT_PIPELINE_BATCH_ROWS)
+from score_cache import DEFAULT_CACHE_PATH
+from review_store import start_run, append_reviews
+import instrumentation
+
+# Execução em lote sem interface (ETL noturno): entrada → VADER → temas → métricas.
+# Não importa Streamlit nem bibliotecas de gráficos.
+#
+#   python cli.py --input data/amazon_reviews.csv --output enriquecido.csv --summary resumo.json
+#   python cli.py --api-offset 0 --api-limit 50000 --output enriquecido.jsonl
+#   cat reviews.csv | python cli.py --input - --output - > enriquecido.csv
+#   python cli.py --input data/amazon_reviews.csv --output /dev/null --store .cache/reviews.sqlite3
+
+OUTPUT_FORMATS = ("csv", "jsonl", "parquet")
+THEME_COLUMNS = ("themes", "positive_themes")
+
+def iter_input_chunks(args):
+    source = sys.stdin if args.input == "-" else args.input
+    return iter_csv_chunks(source, args.chunksize)
+
+def _output_format(args):
+    if args.format:
+        return args.format
+    extension = os.path.splitext(args.output)[1].lstrip(".").lower()
+    return extension if extension in OUTPUT_FORMATS else "csv"
+
+# Escreve cada bloco assim que é analisado (saída em fluxo, inclusive para stdout)
+class ChunkWriter:
+    def __init__(self, output, output_format):
+        self.output_format = output_format
+        self.to_stdout = output == "-"
+        self.path = output
+        self.first = True
+        self.parquet_writer = None
+
+    def write(self, chunk):
+        if self.output_format == "parquet":
+            self._write_parquet(chunk)
+        else:
+            target = sys.stdout if self.to_stdout else self.path
+            mode = "w" if self.first else "a"
+            if self.output_format == "csv":
+                # Listas de temas em JSON para que o CSV possa ser lido de volta
+                chunk = chunk.assign(**{
+                    column: chunk[column].map(lambda themes: json.dumps(themes, ensure_ascii=False))
+                    for column in THEME_COLUMNS
+                })
+                chunk.to_csv(target, mode=mode, header=self.first, index=False)
+            else:
+                chunk.to_json(target, mode=mode, orient="records", lines=True, force_ascii=False)
+        self.first = False
+
+    def _write_parquet(self, chunk):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if self.parquet_writer is None:
+            sink = sys.stdout.buffer if self.to_stdout else self.path
+            self.parquet_writer = pq.ParquetWriter(sink, table.schema)
+        self.parquet_writer.write_table(table)
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+        if self.to_stdout:
+            sys.stdout.flush()
+
+def build_summary(agg):
+    confusion = agg_views.confusion_matrix(agg)
+    return {
+        "rows": int(agg["rows"]),
+        "precision": agg_views.precision(agg),
+        "class_counts": {int(k): int(v) for k, v in agg_views.class_counts(agg).items()},
+        "sentiment_counts": {k: int(v) for k, v in agg_views.sentiment_counts(agg).items()},
+        "crosstab": {
+            int(rating): {sentiment: int(v) for sentiment, v in row.items()}
+            for rating, row in agg_views.crosstab(agg).iterrows()
+        },
+        "negative_themes": {k: int(v) for k, v in agg_views.theme_counts(agg, "Negativo", "themes").items()},
+        "positive_themes": {k: int(v) for k, v in agg_views.theme_counts(agg, "Positivo", "positive_themes").items()},
+        "confusion_matrix": {
+            "labels": agg_views.SENTIMENTS,
+            "values": confusion.tolist(),
+        },
+        "model_metrics": agg_views.model_metrics(agg),
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Análise de sentimento em lote (sem interface)")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", help="CSV de entrada ('-' para stdin)")
+    source.add_argument("--api-offset", type=int, help="Offset inicial na API do HuggingFace")
+    parser.add_argument("--api-limit", type=int, default=300, help="Número de linhas a buscar na API")
+    parser.add_argument("--api-workers", type=int, default=8, help="Requisições simultâneas à API")
+    parser.add_argument("--output", default="-", help="Arquivo com as linhas enriquecidas ('-' para stdout)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, help="Formato da saída (padrão: pela extensão, ou csv)")
+    parser.add_argument("--summary", help="Arquivo JSON com o resumo e as métricas ('-' para stderr)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_STREAM_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=None, help="Processos para o scoring VADER")
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH, help="Cache de scores ('' desativa)")
+    parser.add_argument("--store", help="Banco SQLite de análises: grava as linhas como uma nova execução")
+    parser.add_argument("--profile", help="Grava tempo, vazão e pico de memória por etapa neste JSON")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    cache_path = args.cache_path or None
+    writer = ChunkWriter(args.output, _output_format(args))
+    agg = agg_views.empty_aggregates()
+    duplicate_rows = 0
+    stored_rows = 0
+    # Com --profile, as etapas desta execução gravam em um gravador próprio
+    profiler = instrumentation.Recorder() if args.profile else None
+    # Banco de análises: uma execução por chamada, com as linhas gravadas bloco a bloco
+    store_run = None
+    if args.store:
+        source = args.input if args.input is not None else f"API offset {args.api_offset}"
+        store_run = start_run(source, args.store)
+
+    def store(chunk):
+        nonlocal stored_rows
+        if store_run is None:
+            return
+        with instrumentation.stage("store", rows=len(chunk)):
+            append_reviews(store_run, chunk, start=stored_rows, path=args.store)
+        stored_rows += len(chunk)
+
+    try:
+        with instrumentation.recording(profiler):
+            if args.input is not None:
+                chunks = iter_input_chunks(args)
+                while True:
+                    with instrumentation.stage("load"):
+                        chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    # Saída com os tipos originais e listas de temas (não o layout compacto da interface)
+                    chunk, _ = analyze_reviews(chunk, cache_path=cache_path, workers=args.workers, compact=False)
+                    duplicate_rows += chunk.attrs.get("duplicate_rows", 0)
+                    with instrumentation.stage("aggregate", rows=len(chunk)):
+                        agg = agg_views.merge_aggregates(agg, agg_views.build_aggregates(chunk, row_offset=agg["rows"]))
+                    with instrumentation.stage("write", rows=len(chunk)):
+                        writer.write(chunk)
+                    store(chunk)
+            else:
+                # API: download das próximas páginas em paralelo com a análise dos lotes já recebidos
+                def write_batch(chunk, _):
+                    nonlocal duplicate_rows
+                    duplicate_rows += chunk.attrs.get("duplicate_rows", 0)
+                    with instrumentation.stage("write", rows=len(chunk)):
+                        writer.write(chunk)
+                    store(chunk)
+
+                _, agg, _ = fetch_and_analyze(
+                    args.api_offset, args.api_offset + args.api_limit, on_batch=write_batch, collect=False,
+                    batch_rows=min(args.chunksize, DEFAULT_PIPELINE_BATCH_ROWS), cache_path=cache_path,
+                    workers=args.workers, compact=False, max_workers=args.api_workers,
+                )
+    finally:
+        writer.close()
+        if profiler is not None:
+            profiler.export_json(args.profile)
+
+    if args.summary:
+        summary = build_summary(agg)
+        # Duplicatas exatas de clean_text dentro de cada bloco (pontuadas uma só vez)
+        summary["duplicate_rows"] = int(duplicate_rows)
+        summary["duplication_ratio"] = duplicate_rows / agg["rows"] if agg["rows"] else 0.0
+        summary = json.dumps(summary, ensure_ascii=False, indent=2)
+        if args.summary == "-":
+            print(summary, file=sys.stderr)
+        else:
+            with open(args.summary, "w", encoding="utf-8") as f:
+                f.write(summary + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
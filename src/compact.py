@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+from keyword_detector import THEME_MASK_COLUMN, decode_theme_masks
+from rules import SENTIMENTS
+
+# Layout compacto do dataframe analisado: nota em int8, sentimento como categoria,
+# temas como bitmask (em vez de listas Python por linha). Score e confiança ficam em float64:
+# são exibidos e gravados no banco com os mesmos valores da análise.
+THEME_COLUMNS = ("themes", "positive_themes")
+
+# Notas inteiras de -128 a 127 viram int8; qualquer outro conteúdo fica como está
+def _compact_ratings(ratings):
+    values = pd.to_numeric(ratings, errors="coerce")
+    if values.isna().any() or (values % 1 != 0).any() or values.abs().max() > 127:
+        return ratings
+    return values.astype(np.int8)
+
+def compact_reviews(df):
+    if "class_index" in df:
+        df["class_index"] = _compact_ratings(df["class_index"])
+    if "sentiment_class" in df:
+        df["sentiment_class"] = pd.Categorical(df["sentiment_class"], categories=SENTIMENTS)
+    return df
+
+# Listas de nomes de temas (visão antiga) a partir da bitmask
+def theme_lists(df):
+    columns = decode_theme_masks(df[THEME_MASK_COLUMN].tolist())
+    return {column: pd.Series(columns[column], index=df.index, dtype=object) for column in THEME_COLUMNS}
+
+# Cópia com as colunas themes/positive_themes de listas, para exibição ou exportação
+def with_theme_lists(df, drop_mask=True):
+    expanded = df.assign(**theme_lists(df))
+    return expanded.drop(columns=THEME_MASK_COLUMN) if drop_mask else expanded
+
+def memory_usage_mb(df):
+    return df.memory_usage(deep=True).sum() / 2 ** 20
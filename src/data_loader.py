@@ -1,29 +1,20 @@
 import streamlit as st
 import pandas as pd
-import requests
 import os
+from api_client import fetch_range
+from instrumentation import instrumented
 
 @st.cache_data
+@instrumented()
 def fetch_from_api(offset=0, limit=300):
-    url = f"https://datasets-server.huggingface.co/rows?dataset=yassiracharki/Amazon_Reviews_for_Sentiment_Analysis_fine_grained_5_classes&config=default&split=train&offset={offset}&limit={limit}"
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        records = []
-        for item in data["rows"]:
-            row = item["row"]
-            records.append({
-                "review_title": row["review_title"],
-                "review_text": row["review_text"],
-                "class_index": row["class_index"]
-            })
-        return pd.DataFrame(records)
+        return fetch_range(offset, offset + limit)
     except Exception as e:
         st.error(f"Erro ao buscar dataset via API: {e}")
         return pd.DataFrame()
 
 @st.cache_data
+@instrumented()
 def load_local_csv(filepath="./data/amazon_reviews.csv"):
     if os.path.exists(filepath):
         try:
@@ -34,16 +25,38 @@ def load_local_csv(filepath="./data/amazon_reviews.csv"):
         st.warning("Arquivo CSV local não encontrado.")
     return pd.DataFrame()
 
+# Modo streaming: carrega só as primeiras linhas e guarda o caminho para a análise em blocos
+def load_csv_preview(filepath, nrows=5):
+    if os.path.exists(filepath):
+        try:
+            preview = pd.read_csv(filepath, nrows=nrows)
+            st.session_state.stream_path = filepath
+            return preview
+        except Exception as e:
+            st.error(f"Erro ao carregar CSV local: {e}")
+    else:
+        st.warning("Arquivo CSV local não encontrado.")
+    return pd.DataFrame()
+
 def load_dataset():
-    data_source = st.radio("Escolha a fonte dos dados:", ("Selecione...", "API HuggingFace", "CSV local"))
+    data_source = st.radio("Escolha a fonte dos dados:", ("Selecione...", "API HuggingFace", "CSV local", "CSV local em blocos (arquivos grandes)"))
 
     if data_source == "API HuggingFace":
-        offset = st.number_input("Offset", min_value=0, value=0, step=50)
-        limit = st.number_input("Limite", min_value=10, max_value=1000, value=300, step=50)
-        return fetch_from_api(offset=offset, limit=limit)
+        offset = st.number_input("Offset", min_value=0, value=0, step=50, key="api_offset_input")
+        limit = st.number_input("Limite", min_value=10, max_value=50_000, value=300, step=50, key="api_limit_input")
+        df = fetch_from_api(offset=offset, limit=limit)
+        # "Carregar mais" continua de onde este download parou, em lotes do mesmo tamanho
+        st.session_state.offset = offset + len(df)
+        st.session_state.api_limit = limit
+        return df
     
     elif data_source == "CSV local":
         filepath = st.text_input("Caminho para o CSV local:", "./data/amazon_reviews.csv")
+        st.session_state.source_path = filepath
         return load_local_csv(filepath)
+
+    elif data_source == "CSV local em blocos (arquivos grandes)":
+        filepath = st.text_input("Caminho para o CSV local:", "./data/amazon_reviews.csv")
+        return load_csv_preview(filepath)
     
     return pd.DataFrame()  # Nenhuma opção selecionada ainda
@@ -0,0 +1,73 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+# Cache dos gráficos já renderizados (bytes PNG), chaveado pela impressão digital
+# dos dados analisados e pelos parâmetros do gráfico. Cada figura é fechada logo
+# após a renderização, então o número de figuras abertas não cresce entre reruns.
+DEFAULT_MAX_FIGURES = 64
+# Mesmas opções que o st.pyplot usa ao salvar a figura
+SAVEFIG_OPTIONS = {"format": "png", "dpi": 200, "bbox_inches": "tight"}
+
+_figures = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+# Colunas que os gráficos leem do dataframe analisado
+FINGERPRINT_COLUMNS = ["class_index", "sentiment_class", "sentiment_score", "confidence_percent"]
+
+def dataframe_fingerprint(df, columns=FINGERPRINT_COLUMNS):
+    digest = hashlib.blake2b(digest_size=16)
+    present = [column for column in columns if column in df]
+    digest.update(repr((len(df), present)).encode("utf-8"))
+    if present and len(df):
+        hashes = pd.util.hash_pandas_object(df[present], index=False)
+        digest.update(hashes.to_numpy().tobytes())
+    return digest.hexdigest()
+
+def aggregates_fingerprint(aggregates):
+    digest = hashlib.blake2b(digest_size=16)
+    for key in sorted(aggregates):
+        digest.update(key.encode("utf-8"))
+        digest.update(np.ascontiguousarray(aggregates[key]).tobytes())
+    return digest.hexdigest()
+
+def figure_to_bytes(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, **SAVEFIG_OPTIONS)
+    return buffer.getvalue()
+
+# Devolve os bytes do gráfico; draw() só é chamado (e a figura fechada) quando a chave não está no cache
+def get_or_render(key, draw, max_figures=DEFAULT_MAX_FIGURES):
+    with _lock:
+        if key in _figures:
+            _figures.move_to_end(key)
+            _stats["hits"] += 1
+            return _figures[key]
+        _stats["misses"] += 1
+
+    fig = draw()
+    try:
+        image = figure_to_bytes(fig)
+    finally:
+        plt.close(fig)
+
+    with _lock:
+        _figures[key] = image
+        _figures.move_to_end(key)
+        while len(_figures) > max_figures:
+            _figures.popitem(last=False)
+            _stats["evictions"] += 1
+    return image
+
+def clear():
+    with _lock:
+        _figures.clear()
+
+def cache_stats():
+    with _lock:
+        return dict(_stats, entries=len(_figures), bytes=sum(len(image) for image in _figures.values()))
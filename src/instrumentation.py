@@ -0,0 +1,135 @@
+import contextvars
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Instrumentação por etapa: tempo de parede, vazão (linhas/s) e pico de memória alocada.
+# As etapas gravam no Recorder ativo no contexto atual (ver recording): cada sessão da
+# interface e cada execução em lote mede só as próprias etapas. Sem gravador ativo, cada
+# etapa custa apenas a leitura de uma ContextVar.
+_active = contextvars.ContextVar("instrumentation_recorder", default=None)
+
+# tracemalloc vale para o processo inteiro: fica ligado só enquanto houver alguma execução
+# medida (contagem de usuários). Com execuções medidas ao mesmo tempo, os picos de uma
+# incluem as alocações das outras.
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_started_tracemalloc = False
+
+class Recorder:
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self._records = []
+        self._stack = []
+
+    def reset(self):
+        self._records.clear()
+        self._stack.clear()
+
+    def get_records(self):
+        return list(self._records)
+
+    def export_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.get_records(), f, ensure_ascii=False, indent=2)
+
+def _acquire_tracemalloc():
+    global _tracemalloc_users, _started_tracemalloc
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracemalloc = True
+        _tracemalloc_users += 1
+
+def _release_tracemalloc():
+    global _tracemalloc_users, _started_tracemalloc
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _started_tracemalloc:
+            tracemalloc.stop()
+            _started_tracemalloc = False
+
+# Ativa recorder no contexto atual durante o bloco (None: bloco sem medição)
+@contextmanager
+def recording(recorder):
+    if recorder is None:
+        yield None
+        return
+    if recorder.trace_memory:
+        _acquire_tracemalloc()
+    token = _active.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _active.reset(token)
+        if recorder.trace_memory:
+            _release_tracemalloc()
+
+def is_enabled():
+    return _active.get() is not None
+
+def _memory(recorder):
+    if recorder.trace_memory and tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()
+    return None
+
+# Etapas aninhadas: o pico de cada uma é medido a partir do seu início, e o pico
+# da etapa externa continua considerando o das internas.
+@contextmanager
+def stage(name, rows=None):
+    recorder = _active.get()
+    if recorder is None:
+        yield
+        return
+
+    stack = recorder._stack
+    memory = _memory(recorder)
+    if memory is not None:
+        if stack:
+            stack[-1]["peak"] = max(stack[-1]["peak"], memory[1])
+        tracemalloc.reset_peak()
+    # O registro entra na lista ao iniciar a etapa, para que a ordem siga a execução
+    record = {"stage": name, "depth": len(stack), "rows": rows, "seconds": None,
+              "rows_per_second": None, "peak_memory_mb": None}
+    recorder._records.append(record)
+    frame = {"start_memory": memory[0] if memory else 0, "peak": 0}
+    stack.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        stack.pop()
+        record["seconds"] = seconds
+        record["rows_per_second"] = rows / seconds if rows and seconds > 0 else None
+        memory = _memory(recorder)
+        if memory is not None:
+            peak = max(frame["peak"], memory[1])
+            record["peak_memory_mb"] = max(peak - frame["start_memory"], 0) / 2 ** 20
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+
+def _count_rows(value):
+    if isinstance(value, dict) and "rows" in value:
+        return int(value["rows"])
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+# Decorador: mede a função como uma etapa; as linhas vêm do primeiro argumento (dataframe ou agregados)
+def instrumented(name=None):
+    def decorator(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active.get() is None:
+                return func(*args, **kwargs)
+            with stage(label, rows=_count_rows(args[0]) if args else None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
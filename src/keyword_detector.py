@@ -1,3 +1,14 @@
+from collections import deque
+import numpy as np
+import pandas as pd
+from instrumentation import instrumented
+from preprocessor import first_occurrences, iter_token_ids
+
+# Coluna com os temas de cada review como bitmask (bit = posição no registro de temas)
+THEME_MASK_COLUMN = "theme_mask"
+
+_theme_matcher = None
+
 def detect_keywords(text, keyword_dict):
     matches = []
     for theme, keywords in keyword_dict.items():
@@ -115,11 +126,137 @@ def get_positive_keywords():
         ]
     }
 
-def detect_themes(df):
-    negative_keywords = get_negative_keywords()
-    positive_keywords = get_positive_keywords()
-    
-    df["themes"] = df["clean_text"].apply(lambda x: detect_keywords(x, negative_keywords))
-    df["positive_themes"] = df["clean_text"].apply(lambda x: detect_keywords(x, positive_keywords))
+# Registro fixo de temas: (coluna, tema) na ordem dos dicionários; a posição é o bit do tema
+def get_theme_registry():
+    return (
+        [("themes", theme) for theme in get_negative_keywords()] +
+        [("positive_themes", theme) for theme in get_positive_keywords()]
+    )
+
+# Autômato de Aho–Corasick com todas as palavras-chave (negativas e positivas).
+# Cada estado guarda a máscara de bits dos temas reconhecidos ao alcançá-lo, já
+# unida à dos seus sufixos, e as transições são completas (sem voltar por falhas).
+def build_theme_matcher():
+    keyword_lists = list(get_negative_keywords().values()) + list(get_positive_keywords().values())
+
+    goto = [{}]
+    outputs = [0]
+    for bit, keywords in enumerate(keyword_lists):
+        for keyword in keywords:
+            state = 0
+            for char in keyword:
+                if char not in goto[state]:
+                    goto.append({})
+                    outputs.append(0)
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            outputs[state] |= 1 << bit
+
+    alphabet = {char for transitions in goto for char in transitions}
+    fail = [0] * len(goto)
+    delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        transitions = dict(delta[fail[state]])
+        transitions.update(goto[state])
+        delta[state] = transitions
+        outputs[state] |= outputs[fail[state]]
+        for char, child in goto[state].items():
+            fail[child] = delta[fail[state]].get(char, 0) if state else 0
+            queue.append(child)
+
+    # Remove transições que levam à raiz: caracteres ausentes caem no .get(char, 0)
+    delta = [{char: target for char, target in transitions.items() if target} for transitions in delta]
+    return delta, outputs, alphabet
+
+def get_theme_matcher():
+    global _theme_matcher
+    if _theme_matcher is None:
+        _theme_matcher = build_theme_matcher()
+    return _theme_matcher
+
+# Uma única passada pelo texto: máscara de bits de todos os temas encontrados
+def match_theme_mask(text, matcher=None):
+    delta, outputs, _ = matcher or get_theme_matcher()
+    state = 0
+    mask = 0
+    for char in text:
+        state = delta[state].get(char, 0)
+        mask |= outputs[state]
+    return mask
+
+# Mesma passada do autômato sobre os tokens (equivale a match_theme_mask(" ".join(...))).
+# A travessia de cada token (e do espaço seguinte) a partir de um estado é memorizada em
+# memo[estado][ID], então cada palavra do vocabulário é percorrida caractere a caractere
+# poucas vezes. O espaço após o último token não muda a máscara: nenhuma palavra-chave
+# termina em espaço.
+def match_theme_mask_tokens(token_ids, vocab, memo, matcher=None):
+    delta, outputs, _ = matcher or get_theme_matcher()
+    state = 0
+    mask = 0
+    for token in token_ids:
+        steps = memo.get(state)
+        if steps is None:
+            steps = memo[state] = {}
+        step = steps.get(token)
+        if step is None:
+            end, token_mask = state, 0
+            for char in vocab[token] + " ":
+                end = delta[end].get(char, 0)
+                token_mask |= outputs[end]
+            step = steps[token] = (end, token_mask)
+        state, token_mask = step
+        mask |= token_mask
+    return mask
+
+# Converte máscaras em listas de nomes de temas, separadas por coluna
+def decode_theme_masks(masks):
+    registry = get_theme_registry()
+    decoded = {}
+    columns = {"themes": [], "positive_themes": []}
+    for mask in masks:
+        if mask not in decoded:
+            names = {"themes": [], "positive_themes": []}
+            for bit, (column, theme) in enumerate(registry):
+                if mask >> bit & 1:
+                    names[column].append(theme)
+            decoded[mask] = names
+        for column, names in decoded[mask].items():
+            columns[column].append(list(names))
+    return columns
+
+# Bitmask de temas de cada texto (os 20 temas cabem em uint32); textos repetidos
+# são percorridos uma única vez e a máscara é replicada.
+# Com tokens (fluxo de preprocessor.tokenize_series alinhado a texts), o autômato lê os IDs
+# da primeira ocorrência de cada texto, convertidos em listas um bloco de linhas por vez.
+# duplicates: (códigos, textos únicos) já calculados para texts (ver
+# sentiment_analyzer.deduplicate_texts); sem eles, os textos são fatorados aqui.
+def theme_masks(texts, tokens=None, duplicates=None):
+    matcher = get_theme_matcher()
+    if duplicates is None:
+        duplicates = pd.factorize(pd.Series(texts, dtype=object), use_na_sentinel=False)
+    codes, unique_texts = duplicates
+    if tokens is None:
+        masks = (match_theme_mask(text, matcher) for text in unique_texts)
+    else:
+        memo = {}
+        masks = (match_theme_mask_tokens(token_ids, tokens["vocab"], memo, matcher)
+                 for token_ids in iter_token_ids(tokens, first_occurrences(codes, len(unique_texts))))
+    unique_masks = np.fromiter(masks, dtype=np.uint32, count=len(unique_texts))
+    return unique_masks[codes]
+
+# Como detect_themes, mas guarda só a bitmask (sem listas de nomes por linha)
+@instrumented()
+def detect_theme_masks(df, tokens=None, duplicates=None):
+    df[THEME_MASK_COLUMN] = theme_masks(df["clean_text"], tokens, duplicates)
+    return df
+
+@instrumented()
+def detect_themes(df, tokens=None, duplicates=None):
+    columns = decode_theme_masks(theme_masks(df["clean_text"], tokens, duplicates))
+
+    df["themes"] = pd.Series(columns["themes"], index=df.index, dtype=object)
+    df["positive_themes"] = pd.Series(columns["positive_themes"], index=df.index, dtype=object)
     
     return df
\ No newline at end of file
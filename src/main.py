@@ -1,9 +1,17 @@
+import os
 import streamlit as st
 import pandas as pd
 from data_loader import load_dataset
-from sentiment_analyzer import analyze_sentiment
-from keyword_detector import detect_themes
-from visualization import display_visualizations
+from visualization import display_visualizations, display_partial_results, display_review_search
+from score_cache import DEFAULT_CACHE_PATH, cache_stats
+from pipeline import analyze_reviews_with_tokens, stream_csv
+from preprocessor import concat_tokens
+from search_index import build_index, build_index_in_chunks
+from text_arena import open_arena, arena_path, arena_index_dir, remove_arena, remove_stale_arenas, touch_arena
+from aggregates import build_aggregates, merge_aggregates, precision as aggregate_precision
+from result_cache import load_results, save_results, VIEW_COLUMNS
+from review_store import start_run, save_run, list_runs, store_aggregates, sample_reviews, compare_runs
+import instrumentation
 
 # Configurações da página
 st.set_page_config(page_title="SAFE - Análise de Sentimento", layout="centered")
@@ -13,34 +21,253 @@ st.title("Demonstração de Produto: Reviews da Amazon")
 # Sessão
 if "df_reviews" not in st.session_state:
     st.session_state.df_reviews = pd.DataFrame()
+# API: próximo offset a buscar (fim das linhas já carregadas) e tamanho de cada lote
 if "offset" not in st.session_state:
     st.session_state.offset = 0
+if "api_limit" not in st.session_state:
+    st.session_state.api_limit = 300
+if "stream_path" not in st.session_state:
+    st.session_state.stream_path = None
+if "source_path" not in st.session_state:
+    st.session_state.source_path = None
+# Estado da análise incremental: linhas já analisadas e seus agregados
+if "df_analyzed" not in st.session_state:
+    st.session_state.df_analyzed = pd.DataFrame()
+if "aggregates" not in st.session_state:
+    st.session_state.aggregates = None
+# Índice de busca: um segmento por lote de linhas analisadas
+if "search_index" not in st.session_state:
+    st.session_state.search_index = []
+# Modo streaming com arena: todas as linhas (textos no disco) para a busca
+if "stream_rows" not in st.session_state:
+    st.session_state.stream_rows = None
+# Arena desta sessão (uma por execução; a anterior é apagada quando stream_rows é substituído)
+if "stream_arena" not in st.session_state:
+    st.session_state.stream_arena = None
+# A cada execução do script a sessão marca a própria arena como em uso, e arenas abandonadas
+# (sem toque há mais de ARENA_MAX_AGE_SECONDS) são apagadas, com seus índices em disco
+if st.session_state.stream_arena:
+    touch_arena(st.session_state.stream_arena)
+remove_stale_arenas()
+if st.session_state.stream_arena and not os.path.exists(st.session_state.stream_arena):
+    # Arena apagada por idade (sessão parada por muito tempo): a busca no arquivo inteiro sai
+    st.session_state.stream_arena = None
+    st.session_state.stream_rows = None
+    st.session_state.search_index = []
+# Execução do banco de análises aberta no painel (None: painel normal)
+if "store_run" not in st.session_state:
+    st.session_state.store_run = None
+# Linhas de df_analyzed já salvas no banco (evita gravar a mesma análise de novo)
+if "stored_rows" not in st.session_state:
+    st.session_state.stored_rows = 0
+
+# Instrumentação de desempenho (tempo, vazão e memória por etapa): gravador próprio de
+# cada sessão, ativo só durante os carregamentos e as análises medidos (ver profiled_run)
+profiling = st.sidebar.checkbox("⏱️ Medir desempenho por etapa")
+if "profiler" not in st.session_state:
+    st.session_state.profiler = instrumentation.Recorder()
+
+# Linhas analisadas por bloco na interface: progresso e resultados parciais a cada bloco
+PROGRESS_CHUNK_ROWS = 5_000
+
+# Analisa as linhas novas em blocos, atualizando a barra de progresso e os números parciais;
+# devolve as linhas analisadas, os agregados acumulados (usados depois nos gráficos finais)
+# e o fluxo de tokens das linhas (para o índice de busca).
+# row_offset: posição de new_rows no dataframe analisado (linhas já analisadas antes delas)
+def analyze_with_progress(new_rows, aggregates, row_offset=0):
+    progress = st.progress(0.0, text="Analisando reviews...")
+    partial = st.empty()
+    analyzed_chunks = []
+    token_streams = []
+    duplicate_rows = 0
+    for start in range(0, len(new_rows), PROGRESS_CHUNK_ROWS):
+        chunk = new_rows.iloc[start:start + PROGRESS_CHUNK_ROWS].copy()
+        chunk, _, tokens = analyze_reviews_with_tokens(chunk, cache_path=DEFAULT_CACHE_PATH)
+        token_streams.append(tokens)
+        duplicate_rows += chunk.attrs.get("duplicate_rows", 0)
+        chunk_aggregates = build_aggregates(chunk, row_offset=row_offset + start)
+        aggregates = chunk_aggregates if aggregates is None else merge_aggregates(aggregates, chunk_aggregates)
+        analyzed_chunks.append(chunk)
+
+        done = start + len(chunk)
+        progress.progress(done / len(new_rows), text=f"Analisando reviews: {done} de {len(new_rows)}")
+        with partial.container():
+            display_partial_results(aggregates)
+    progress.empty()
+    partial.empty()
+
+    analyzed = pd.concat(analyzed_chunks, ignore_index=True)
+    analyzed.attrs = {"duplicate_rows": duplicate_rows, "duplication_ratio": duplicate_rows / len(analyzed)}
+    return analyzed, aggregates, concat_tokens(token_streams)
+
+# Painel de uma análise salva: gráficos a partir do cubo calculado no banco (SQL) e de uma
+# amostra de reviews, e a comparação lado a lado com as demais execuções
+def display_stored_run(run_id, runs):
+    st.subheader(f"🗄️ Análise salva #{run_id}")
+    if st.button("✖️ Fechar análise salva"):
+        st.session_state.store_run = None
+        st.rerun()
+    aggregates = store_aggregates(run_id)
+    st.caption(f"{aggregates['rows']} reviews no banco; gráficos por review usam uma amostra.")
+    display_visualizations(sample_reviews(run_id), aggregate_precision(aggregates), aggregates=aggregates)
+
+    st.subheader("📊 Comparação entre análises salvas")
+    selected = st.multiselect("Execuções", runs["run_id"].tolist(), default=runs["run_id"].tolist()[:5],
+                              format_func=run_labels(runs).get)
+    if selected:
+        st.dataframe(compare_runs(selected).round(3), hide_index=True, width="stretch")
+
+def run_labels(runs):
+    return {run.run_id: f"#{run.run_id} · {run.source} · {run.created_at} ({run.rows} reviews)"
+            for run in runs.itertuples()}
+
+# Bloco medido: com a opção marcada, as etapas gravam só no gravador desta sessão
+# (cada carregamento ou análise substitui as medições do anterior no painel)
+def profiled_run():
+    recorder = st.session_state.profiler if profiling else None
+    if recorder is not None:
+        recorder.reset()
+    return instrumentation.recording(recorder)
+
+def display_instrumentation_panel():
+    records = st.session_state.profiler.get_records()
+    if not profiling or not records:
+        return
+    st.sidebar.subheader("⏱️ Desempenho por etapa")
+    table = pd.DataFrame(records)
+    table["stage"] = ["  " * depth + name for depth, name in zip(table["depth"], table["stage"])]
+    st.sidebar.dataframe(table.drop(columns="depth").round(3), hide_index=True)
+    st.sidebar.download_button("Exportar JSON", data=table.to_json(orient="records", force_ascii=False),
+                               file_name="instrumentacao.json", mime="application/json")
+
+# Banco de análises (SQLite local): cada análise pode ser salva como uma execução e reaberta depois
+st.sidebar.subheader("🗄️ Banco de análises")
+save_to_store = st.sidebar.checkbox("Salvar as análises no banco")
+stored_runs = list_runs()
+if not stored_runs.empty:
+    labels = run_labels(stored_runs)
+    chosen_run = st.sidebar.selectbox("Análises salvas", list(labels), format_func=labels.get)
+    if st.sidebar.button("📂 Abrir análise salva"):
+        st.session_state.store_run = chosen_run
+
+if st.session_state.store_run is not None:
+    display_stored_run(st.session_state.store_run, stored_runs)
+    st.stop()
 
 # Interface de carregamento
 if st.session_state.df_reviews.empty:
-    df = load_dataset()
+    with profiled_run():
+        df = load_dataset()
     if not df.empty:
         st.session_state.df_reviews = df
+        display_instrumentation_panel()
 
 df = st.session_state.df_reviews
 
-if not df.empty:
+if not df.empty and st.session_state.stream_path:
+    st.subheader(f"📦 Modo streaming: {st.session_state.stream_path}")
+    st.write(df.head())
+    use_arena = st.checkbox("💾 Manter todas as reviews, com os textos em arena no disco (busca no arquivo inteiro)")
+
+    if st.button("🔍 Executar Análise de Sentimento"):
+        with profiled_run():
+            # Arquivo processado em blocos: só agregados e uma amostra ficam em memória
+            # (com a arena, todas as linhas ficam, mas só com números e posições dos textos)
+            arena = open_arena(arena_path(st.session_state.stream_path)) if use_arena else None
+            status = st.empty()
+            partial = st.empty()
+
+            def show_progress(partial_aggregates):
+                status.caption(f"⏳ {partial_aggregates['rows']} reviews processadas até agora...")
+                with partial.container():
+                    display_partial_results(partial_aggregates)
+
+            # No banco vão todas as linhas, bloco a bloco, mesmo sem a arena
+            run_id = start_run(st.session_state.stream_path) if save_to_store else None
+            with st.spinner("Processando o arquivo em blocos..."):
+                aggregates, sample_df, precision = stream_csv(st.session_state.stream_path, cache_path=DEFAULT_CACHE_PATH,
+                                                              on_chunk=show_progress, arena=arena, store_run=run_id)
+            status.empty()
+            partial.empty()
+            if run_id is not None:
+                st.caption(f"Análise salva no banco como execução #{run_id}.")
+            if arena is not None:
+                st.caption(f"{aggregates['rows']} reviews processadas; textos guardados em {arena.path}.")
+                st.session_state.stream_rows = sample_df
+                st.session_state.search_index = build_index_in_chunks(sample_df, directory=arena_index_dir(arena.path))
+            else:
+                st.caption(f"{aggregates['rows']} reviews processadas; gráficos por review usam uma amostra de {len(sample_df)} linhas.")
+                st.session_state.stream_rows = None
+                st.session_state.search_index = []
+            previous_arena = st.session_state.stream_arena
+            st.session_state.stream_arena = arena.path if arena is not None else None
+            if previous_arena is not None:
+                remove_arena(previous_arena)
+            display_visualizations(sample_df, precision, aggregates=aggregates)
+            display_instrumentation_panel()
+
+    if st.session_state.stream_rows is not None:
+        display_review_search(st.session_state.stream_rows, st.session_state.search_index)
+
+elif not df.empty:
     total_reviews = len(df)
     st.subheader(f"📦 Dataset Carregado - Total de Reviews: {total_reviews}")
     st.write(df.head())
 
     if st.button("🔍 Executar Análise de Sentimento"):
-        # Análise de sentimento otimizada
-        df, precision = analyze_sentiment(df)
-        df = detect_themes(df)
-        display_visualizations(df, precision)
+        with profiled_run():
+            source_path = st.session_state.source_path
+            if st.session_state.df_analyzed.empty and source_path:
+                cached_df = load_results(source_path, columns=VIEW_COLUMNS)
+                if cached_df is not None:
+                    # Mesmo arquivo e mesma configuração: resultado lido do cache colunar
+                    st.caption("Resultados carregados do cache de análises.")
+                    st.session_state.df_analyzed = cached_df
+                    st.session_state.aggregates = build_aggregates(cached_df)
+                    st.session_state.search_index = [build_index(cached_df)]
+
+            # Só as linhas ainda não analisadas (ex.: páginas novas da API) passam pelo pipeline
+            analyzed = st.session_state.df_analyzed
+            new_rows = df.iloc[len(analyzed):].copy()
+            if not new_rows.empty:
+                new_rows, st.session_state.aggregates, tokens = analyze_with_progress(new_rows, st.session_state.aggregates,
+                                                                                   row_offset=len(analyzed))
+                st.session_state.search_index.append(build_index(new_rows, tokens, row_offset=len(analyzed)))
+                stats = cache_stats(DEFAULT_CACHE_PATH)
+                st.caption(f"Cache de scores: {stats['hits']} acertos, {stats['misses']} faltas, {stats['entries']} textos armazenados")
+                duplicate_rows = new_rows.attrs.get("duplicate_rows", 0)
+                st.caption(f"Textos duplicados dentro de cada bloco de {PROGRESS_CHUNK_ROWS} reviews: "
+                           f"{duplicate_rows} de {len(new_rows)} ({new_rows.attrs.get('duplication_ratio', 0.0):.1%}), "
+                           "analisados uma única vez")
+                if analyzed.empty:
+                    st.session_state.df_analyzed = new_rows
+                    if source_path:
+                        save_results(new_rows, source_path)
+                else:
+                    st.session_state.df_analyzed = pd.concat([analyzed, new_rows], ignore_index=True)
+
+            # Cada análise concluída vira uma execução com todas as linhas analisadas até aqui
+            if save_to_store and st.session_state.stored_rows != len(st.session_state.df_analyzed):
+                run_id = save_run(st.session_state.df_analyzed, source_path or "API")
+                st.session_state.stored_rows = len(st.session_state.df_analyzed)
+                st.caption(f"Análise salva no banco como execução #{run_id}.")
+
+            aggregates = st.session_state.aggregates
+            display_visualizations(st.session_state.df_analyzed, aggregate_precision(aggregates), aggregates=aggregates)
+            display_instrumentation_panel()
+
+    # Fora do botão: a busca continua disponível nos reruns disparados pelos próprios filtros
+    if not st.session_state.df_analyzed.empty:
+        display_review_search(st.session_state.df_analyzed, st.session_state.search_index)
 
     if st.radio("Você está usando a API para carregar dados?", ("Sim", "Não"), index=1) == "Sim":
         if st.button("➕ Carregar mais reviews da API"):
             from data_loader import fetch_from_api
-            new_data = fetch_from_api(offset=st.session_state.offset + 300)
+            with profiled_run():
+                new_data = fetch_from_api(offset=st.session_state.offset, limit=st.session_state.api_limit)
+            display_instrumentation_panel()
             if not new_data.empty:
-                st.session_state.offset += 300
+                st.session_state.offset += len(new_data)
                 st.session_state.df_reviews = pd.concat([st.session_state.df_reviews, new_data], ignore_index=True)
                 st.success("Mais reviews carregadas com sucesso.")
             else:
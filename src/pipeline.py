@@ -0,0 +1,186 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from api_client import (create_session, fetch_page, API_URL, MAX_PAGE_SIZE, REVIEW_COLUMNS, DEFAULT_MAX_WORKERS,
+                        DEFAULT_TIMEOUT, DEFAULT_MAX_RETRIES, DEFAULT_BACKOFF)
+from preprocessor import tokenize_series
+from sentiment_analyzer import analyze_sentiment, deduplicate_texts
+from keyword_detector import detect_themes, detect_theme_masks
+from aggregates import empty_aggregates, build_aggregates, merge_aggregates, precision
+from compact import compact_reviews
+from text_arena import store_text_columns, ARENA_ATTR
+from review_store import append_reviews, DEFAULT_STORE_PATH
+from instrumentation import stage
+
+# Pipeline sem interface: pré-processamento → VADER → temas
+DEFAULT_STREAM_CHUNK_SIZE = 50_000
+DEFAULT_SAMPLE_SIZE = 5_000
+
+# Pipeline assíncrono da API: linhas por lote analisado e tamanho das filas limitadas
+DEFAULT_PIPELINE_BATCH_ROWS = 2_000
+DEFAULT_PREFETCH_PAGES = 32
+DEFAULT_ANALYSIS_QUEUE_SIZE = 2
+
+# compact=True (padrão): layout compacto, com temas em bitmask (ver compact.py);
+# compact=False mantém os tipos originais e as colunas de listas de temas.
+# Cada review é tokenizada uma única vez e o clean_text é deduplicado uma única vez; VADER e
+# temas leem o mesmo fluxo de tokens e os mesmos códigos de duplicatas. O fluxo também é
+# devolvido (ex.: para montar o índice de busca sem tokenizar de novo).
+def analyze_reviews_with_tokens(df, cache_path=None, workers=None, compact=True):
+    with stage("preprocess_text", rows=len(df)):
+        df["clean_text"], tokens = tokenize_series(df["review_text"])
+    with stage("deduplicate", rows=len(df)):
+        duplicates = deduplicate_texts(df["clean_text"])
+    df, precision_value = analyze_sentiment(df, cache_path=cache_path, workers=workers, preprocessed=True,
+                                            duplicates=duplicates)
+    if not compact:
+        return detect_themes(df, tokens, duplicates), precision_value, tokens
+    df = detect_theme_masks(df, tokens, duplicates)
+    return compact_reviews(df), precision_value, tokens
+
+def analyze_reviews(df, cache_path=None, workers=None, compact=True):
+    df, precision_value, _ = analyze_reviews_with_tokens(df, cache_path, workers, compact)
+    return df, precision_value
+
+def iter_csv_chunks(filepath, chunksize=DEFAULT_STREAM_CHUNK_SIZE):
+    return pd.read_csv(filepath, chunksize=chunksize)
+
+# Amostragem por reservatório: mantém até sample_size linhas uniformes de todo o fluxo.
+# A amostra é indexada pela vaga do reservatório (0 a sample_size - 1).
+def update_sample(sample, chunk, seen, sample_size, rng):
+    chunk = chunk.reset_index(drop=True)
+    positions = np.arange(seen, seen + len(chunk))
+    slots = np.where(positions < sample_size, positions, rng.integers(0, positions + 1))
+
+    # Para cada vaga, vale a última linha do bloco sorteada para ela
+    accepted = pd.Series(np.arange(len(chunk)), index=slots)
+    accepted = accepted[accepted.index < sample_size]
+    accepted = accepted[~accepted.index.duplicated(keep="last")]
+    incoming = chunk.iloc[accepted.to_numpy()].set_axis(accepted.index)
+    if sample is None:
+        return incoming.sort_index()
+    return pd.concat([sample.drop(index=incoming.index, errors="ignore"), incoming]).sort_index()
+
+# Processa o CSV bloco a bloco: a memória fica limitada ao bloco atual, aos
+# agregados (tamanho fixo) e à amostra (até sample_size linhas).
+# on_chunk(agregados_acumulados) é chamado após cada bloco (resultados parciais na interface).
+# Com arena (text_arena.TextArena), os textos de cada bloco vão para o disco e todas as
+# linhas são mantidas, só com números e posições na arena, no lugar da amostra.
+# Com store_run (review_store.start_run), cada bloco também é gravado no banco de análises.
+def stream_csv(filepath, chunksize=DEFAULT_STREAM_CHUNK_SIZE, sample_size=DEFAULT_SAMPLE_SIZE,
+               cache_path=None, workers=None, seed=42, on_chunk=None, arena=None,
+               store_run=None, store_path=DEFAULT_STORE_PATH):
+    agg = empty_aggregates()
+    sample = None
+    rows = []
+    seen = 0
+    rng = np.random.default_rng(seed)
+    for chunk in iter_csv_chunks(filepath, chunksize):
+        chunk, _ = analyze_reviews(chunk, cache_path=cache_path, workers=workers)
+        agg = merge_aggregates(agg, build_aggregates(chunk, row_offset=seen))
+        if store_run is not None:
+            append_reviews(store_run, chunk, start=seen, path=store_path)
+        if arena is not None:
+            rows.append(store_text_columns(chunk, arena))
+        else:
+            sample = update_sample(sample, chunk, seen, sample_size, rng)
+        seen += len(chunk)
+        if on_chunk is not None:
+            on_chunk(agg)
+    if arena is not None and rows:
+        # attrs diferentes entre blocos (duplicatas) se perdem no concat; fica só o da arena
+        sample = pd.concat(rows, ignore_index=True)
+        sample.attrs = {ARENA_ATTR: arena.path}
+    sample = pd.DataFrame() if sample is None else sample.reset_index(drop=True)
+    return agg, sample, precision(agg)
+
+# Produtor: dispara o download de cada página na ordem dos offsets. A fila guarda as
+# tarefas (não os resultados), então a ordem é preservada e, com a fila cheia, novos
+# downloads esperam o consumidor (backpressure).
+async def _produce_pages(offsets, fetch, page_queue, semaphore):
+    async def fetch_limited(offset):
+        async with semaphore:
+            return await asyncio.to_thread(fetch, offset)
+
+    for offset in offsets:
+        await page_queue.put(asyncio.create_task(fetch_limited(offset)))
+    await page_queue.put(None)
+
+# Junta as páginas baixadas em lotes de batch_rows linhas para a análise
+async def _batch_pages(page_queue, batch_queue, batch_rows):
+    records = []
+    while (task := await page_queue.get()) is not None:
+        records.extend(await task)
+        if len(records) >= batch_rows:
+            await batch_queue.put(pd.DataFrame(records, columns=REVIEW_COLUMNS))
+            records = []
+    if records:
+        await batch_queue.put(pd.DataFrame(records, columns=REVIEW_COLUMNS))
+    await batch_queue.put(None)
+
+# Consumidor: analisa um lote por vez em uma thread própria enquanto os downloads continuam
+async def _analyze_batches(batch_queue, analyze, on_batch):
+    loop = asyncio.get_running_loop()
+    agg = empty_aggregates()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        while (batch := await batch_queue.get()) is not None:
+            # O lote roda com o contexto atual (ex.: o gravador de instrumentação ativo)
+            context = contextvars.copy_context()
+            analyzed, batch_agg = await loop.run_in_executor(executor, context.run, analyze, batch)
+            agg = merge_aggregates(agg, batch_agg)
+            if on_batch is not None:
+                on_batch(analyzed, agg)
+    return agg
+
+# Baixa as linhas [start, stop) da API e analisa os lotes já recebidos enquanto as
+# próximas páginas são baixadas: o tempo total tende a max(rede, CPU) em vez da soma.
+# on_batch(lote_analisado, agregados_acumulados) é chamado a cada lote, em ordem.
+async def fetch_and_analyze_async(start, stop, on_batch=None, batch_rows=DEFAULT_PIPELINE_BATCH_ROWS,
+                                  cache_path=None, workers=None, compact=True,
+                                  max_workers=DEFAULT_MAX_WORKERS, prefetch_pages=DEFAULT_PREFETCH_PAGES,
+                                  analysis_queue_size=DEFAULT_ANALYSIS_QUEUE_SIZE, page_size=MAX_PAGE_SIZE,
+                                  base_url=API_URL, timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES,
+                                  backoff=DEFAULT_BACKOFF):
+    page_size = min(page_size, MAX_PAGE_SIZE)
+    session = create_session(max_workers)
+
+    def fetch(offset):
+        return fetch_page(session, offset, min(page_size, stop - offset), base_url, timeout, max_retries, backoff)
+
+    # Os lotes são analisados um por vez e em ordem: analyzed_rows é a posição do próximo lote
+    analyzed_rows = 0
+
+    def analyze(batch):
+        nonlocal analyzed_rows
+        analyzed, _ = analyze_reviews(batch, cache_path=cache_path, workers=workers, compact=compact)
+        batch_agg = build_aggregates(analyzed, row_offset=analyzed_rows)
+        analyzed_rows += len(analyzed)
+        return analyzed, batch_agg
+
+    page_queue = asyncio.Queue(maxsize=prefetch_pages)
+    batch_queue = asyncio.Queue(maxsize=analysis_queue_size)
+    try:
+        _, _, agg = await asyncio.gather(
+            _produce_pages(range(start, stop, page_size), fetch, page_queue, asyncio.Semaphore(max_workers)),
+            _batch_pages(page_queue, batch_queue, batch_rows),
+            _analyze_batches(batch_queue, analyze, on_batch),
+        )
+    finally:
+        session.close()
+    return agg
+
+# Versão síncrona; com collect=True devolve também o dataframe analisado completo
+def fetch_and_analyze(start, stop, on_batch=None, collect=True, **kwargs):
+    frames = []
+
+    def handle_batch(analyzed, agg):
+        if collect:
+            frames.append(analyzed)
+        if on_batch is not None:
+            on_batch(analyzed, agg)
+
+    agg = asyncio.run(fetch_and_analyze_async(start, stop, on_batch=handle_batch, **kwargs))
+    df = pd.concat(frames, ignore_index=True) if frames else None
+    return df, agg, precision(agg)
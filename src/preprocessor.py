@@ -1,18 +1,175 @@
+import os
 import re
-import nltk
-nltk.download('stopwords')
-from nltk.corpus import stopwords
 
-# Download dos recursos necessários do NLTK
+# Snapshot local e versionado dos recursos do NLTK/VADER (nenhum acesso à rede em tempo de uso)
+NLTK_SNAPSHOT_VERSION = "1"
+NLTK_SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "nltk_snapshot")
+STOPWORDS_SNAPSHOT_PATH = os.path.join(NLTK_SNAPSHOT_DIR, "stopwords_english.txt")
+VADER_LEXICON_SNAPSHOT_PATH = os.path.join(NLTK_SNAPSHOT_DIR, "vader_lexicon.txt")
+
+# Expressão compilada uma única vez e reutilizada em todas as reviews
+NON_ALPHA_PATTERN = re.compile(r'[^a-zA-Z\s]')
+
+# Tamanho padrão dos blocos processados por preprocess_series
+DEFAULT_CHUNK_SIZE = 50_000
+# Reviews por bloco convertido em listas Python por iter_token_ids
+TOKEN_LIST_CHUNK_ROWS = 1_000
+
+_stopword_set = None
+
+# Download dos recursos necessários do NLTK e atualização do snapshot local.
+# Etapa de configuração feita uma única vez (python preprocessor.py), nunca na importação.
 def download_nltk_resources():
+    import shutil
+    import nltk
+    from nltk.corpus import stopwords
+    import vaderSentiment
+
     nltk.download('stopwords')
     nltk.download('punkt')
     nltk.download('vader_lexicon')
 
+    os.makedirs(NLTK_SNAPSHOT_DIR, exist_ok=True)
+    with open(STOPWORDS_SNAPSHOT_PATH, "w", encoding="utf-8") as f:
+        f.write("\n".join(stopwords.words('english')) + "\n")
+    shutil.copyfile(
+        os.path.join(os.path.dirname(vaderSentiment.__file__), "vader_lexicon.txt"),
+        VADER_LEXICON_SNAPSHOT_PATH
+    )
+
+# Carrega as stopwords do snapshot local na primeira chamada (busca O(1) em um conjunto)
+def get_stopwords():
+    global _stopword_set
+    if _stopword_set is None:
+        if os.path.exists(STOPWORDS_SNAPSHOT_PATH):
+            with open(STOPWORDS_SNAPSHOT_PATH, encoding="utf-8") as f:
+                _stopword_set = frozenset(line.strip() for line in f if line.strip())
+        else:
+            from nltk.corpus import stopwords
+            _stopword_set = frozenset(stopwords.words('english'))
+    return _stopword_set
+
 # Pré-processamento do texto
 def preprocess_text(text):
     text = text.lower()
-    text = re.sub(r'[^a-zA-Z\s]', '', text)
-    words = text.split()
-    words = [word for word in words if word not in stopwords.words('english')]
+    text = NON_ALPHA_PATTERN.sub('', text)
+    stop_words = get_stopwords()
+    words = [word for word in text.split() if word not in stop_words]
     return ' '.join(words)
+
+# Palavras de cada texto com a limpeza de preprocess_text, bloco a bloco. Minúsculas e remoção
+# de caracteres não alfabéticos são vetorizadas sobre o bloco (dtype object garante as mesmas
+# regras de str.lower usadas em preprocess_text); as stopwords saem palavra a palavra.
+def _iter_clean_words(series, chunk_size):
+    stop_words = get_stopwords()
+    for start in range(0, len(series), chunk_size):
+        chunk = series.iloc[start:start + chunk_size]
+        normalized = chunk.astype(object).str.lower().str.replace(NON_ALPHA_PATTERN, '', regex=True)
+        for text in normalized:
+            yield [word for word in text.split() if word not in stop_words]
+
+# Pré-processamento em lote: mesmo resultado de preprocess_text, bloco a bloco
+def preprocess_series(series, chunk_size=DEFAULT_CHUNK_SIZE):
+    import pandas as pd
+
+    cleaned = [' '.join(words) for words in _iter_clean_words(series, chunk_size)]
+    return pd.Series(cleaned, index=series.index, name=series.name)
+
+# Tokenização única compartilhada pelas etapas seguintes (temas, índices de busca):
+# IDs int32 sobre um vocabulário comum (ID = posição em "vocab"); os tokens da review i
+# são ids[offsets[i]:offsets[i + 1]]. O clean_text é montado na mesma passada.
+# Os IDs vão direto para um buffer de int32 (array), sem uma lista de ints por review, e
+# o vocabulário atribui o próximo ID em C (defaultdict cujo valor padrão é o seu tamanho).
+def tokenize_series(series, chunk_size=DEFAULT_CHUNK_SIZE):
+    import array
+    from collections import defaultdict
+    import numpy as np
+    import pandas as pd
+
+    vocabulary = defaultdict()
+    vocabulary.default_factory = vocabulary.__len__
+    word_id = vocabulary.__getitem__
+    cleaned = []
+    ids = array.array("i")
+    lengths = array.array("q", [0])
+    for words in _iter_clean_words(series, chunk_size):
+        cleaned.append(' '.join(words))
+        ids.fromlist(list(map(word_id, words)))
+        lengths.append(len(words))
+
+    tokens = {
+        "vocab": list(vocabulary),
+        "ids": np.frombuffer(ids, dtype=np.int32),
+        "offsets": np.cumsum(np.frombuffer(lengths, dtype=np.int64)),
+    }
+    return pd.Series(cleaned, index=series.index, name=series.name), tokens
+
+# Fluxo de tokens a partir de textos já limpos (ex.: clean_text lido do cache de resultados),
+# sem repetir a limpeza: palavras separadas por um espaço, vocabulário via pd.factorize
+def tokenize_clean_texts(texts):
+    import numpy as np
+    import pandas as pd
+
+    texts = pd.Series(texts, dtype=object)
+    lengths = np.where(texts.to_numpy() == "", 0, texts.str.count(" ").to_numpy() + 1)
+    ids, vocab = pd.factorize(pd.Series(" ".join(texts).split(), dtype=object))
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return {"vocab": list(vocab), "ids": ids.astype(np.int32), "offsets": offsets}
+
+# Linha da primeira ocorrência de cada código (códigos de pd.factorize, 0 a count - 1)
+def first_occurrences(codes, count):
+    import numpy as np
+
+    first = np.zeros(count, dtype=np.int64)
+    first[codes[::-1]] = np.arange(len(codes) - 1, -1, -1)
+    return first
+
+# Subconjunto do fluxo de tokens com as linhas indicadas, mesmo vocabulário
+def take_tokens(tokens, rows):
+    import numpy as np
+
+    starts = tokens["offsets"][:-1][rows]
+    lengths = tokens["offsets"][1:][rows] - starts
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    positions = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+    return {"vocab": tokens["vocab"], "ids": tokens["ids"][positions], "offsets": offsets}
+
+# Junta fluxos de tokens (ex.: um por bloco analisado) em um só, com vocabulário unificado;
+# os IDs de cada fluxo são traduzidos por uma tabela do tamanho do seu vocabulário
+def concat_tokens(streams):
+    import numpy as np
+
+    vocabulary = {}
+    ids = []
+    lengths = [np.zeros(1, dtype=np.int64)]
+    for tokens in streams:
+        mapping = np.array([vocabulary.setdefault(word, len(vocabulary)) for word in tokens["vocab"]],
+                           dtype=np.int32)
+        ids.append(mapping[tokens["ids"]] if len(mapping) else tokens["ids"])
+        lengths.append(np.diff(tokens["offsets"]))
+    return {
+        "vocab": list(vocabulary),
+        "ids": np.concatenate(ids) if ids else np.zeros(0, dtype=np.int32),
+        "offsets": np.cumsum(np.concatenate(lengths)),
+    }
+
+# IDs de cada review (todas, ou só as linhas rows) como listas Python, para laços por token
+# sem conversões do NumPy. A conversão é feita em blocos de chunk_rows linhas: só um bloco
+# de listas existe por vez e o fluxo inteiro continua nos arrays int32.
+def iter_token_ids(tokens, rows=None, chunk_rows=TOKEN_LIST_CHUNK_ROWS):
+    import numpy as np
+
+    if rows is None:
+        rows = np.arange(len(tokens["offsets"]) - 1)
+    for start in range(0, len(rows), chunk_rows):
+        chunk = take_tokens(tokens, rows[start:start + chunk_rows])
+        ids = chunk["ids"].tolist()
+        offsets = chunk["offsets"].tolist()
+        for begin, end in zip(offsets, offsets[1:]):
+            yield ids[begin:end]
+
+
+if __name__ == "__main__":
+    download_nltk_resources()
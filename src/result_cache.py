@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+import pandas as pd
+from preprocessor import NLTK_SNAPSHOT_VERSION
+from sentiment_analyzer import get_score_version
+from keyword_detector import get_negative_keywords, get_positive_keywords, THEME_MASK_COLUMN
+
+# Cache colunar (Parquet) do dataframe enriquecido, indexado pela impressão digital
+# do arquivo de entrada e pela configuração dos analisadores.
+RESULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "results")
+
+# Versão do layout das colunas gravadas (layout compacto, temas em bitmask)
+RESULT_LAYOUT_VERSION = "compact-2"
+
+# Colunas usadas pelos gráficos e pela busca (clean_text alimenta o índice invertido)
+VIEW_COLUMNS = ["review_title", "review_text", "class_index", "clean_text", "sentiment_score", "sentiment_class",
+                "confidence_percent", THEME_MASK_COLUMN]
+
+# Bytes lidos do início e do fim do arquivo para a impressão digital
+_FINGERPRINT_SAMPLE = 1 << 20
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+# Tamanho + data de modificação + hash do início e do fim: rápido mesmo para arquivos de vários GB
+def file_fingerprint(filepath):
+    stat = os.stat(filepath)
+    digest = hashlib.blake2b(f"{stat.st_size}:{stat.st_mtime_ns}".encode(), digest_size=16)
+    with open(filepath, "rb") as f:
+        digest.update(f.read(_FINGERPRINT_SAMPLE))
+        if stat.st_size > _FINGERPRINT_SAMPLE:
+            f.seek(max(stat.st_size - _FINGERPRINT_SAMPLE, _FINGERPRINT_SAMPLE))
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def analyzer_config_key():
+    config = {
+        "score": get_score_version(),
+        "nltk_snapshot": NLTK_SNAPSHOT_VERSION,
+        "negative_keywords": get_negative_keywords(),
+        "positive_keywords": get_positive_keywords(),
+        "layout": RESULT_LAYOUT_VERSION,
+    }
+    return hashlib.blake2b(json.dumps(config, sort_keys=True).encode(), digest_size=8).hexdigest()
+
+def result_path(filepath, cache_dir=RESULT_CACHE_DIR):
+    return os.path.join(cache_dir, f"{file_fingerprint(filepath)}-{analyzer_config_key()}.parquet")
+
+# Grava o resultado da análise; retorna o caminho do arquivo ou None sem pyarrow
+def save_results(df, filepath, cache_dir=RESULT_CACHE_DIR):
+    if not parquet_available():
+        return None
+    path = result_path(filepath, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+# Lê só as colunas pedidas de um resultado já calculado; None se não existir
+def load_results(filepath, columns=None, cache_dir=RESULT_CACHE_DIR):
+    if not parquet_available() or not os.path.exists(filepath):
+        return None
+    path = result_path(filepath, cache_dir)
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path, columns=columns)
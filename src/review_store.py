@@ -0,0 +1,237 @@
+import os
+import sqlite3
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from keyword_detector import THEME_MASK_COLUMN, get_theme_registry
+from aggregates import empty_aggregates, theme_bits, CONFIDENCE_BINS
+from rules import RATINGS, SENTIMENTS, RATING_RULES, ANY_SENTIMENT
+from text_arena import decode_text_columns
+
+# Banco analítico local (SQLite) com as reviews analisadas e seus temas, uma execução
+# ("run") por análise salva. Índices por nota, sentimento e tema permitem agregar e filtrar
+# direto no banco: o cubo dos gráficos sai de consultas GROUP BY, sem carregar as reviews.
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "reviews.sqlite3")
+# Linhas gravadas por transação
+STORE_BATCH_ROWS = 50_000
+TEXT_COLUMNS = ("review_title", "review_text")
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS runs ("
+    "run_id INTEGER PRIMARY KEY AUTOINCREMENT, source TEXT NOT NULL, created_at TEXT NOT NULL, "
+    "rows INTEGER NOT NULL DEFAULT 0)",
+    "CREATE TABLE IF NOT EXISTS reviews ("
+    "run_id INTEGER NOT NULL, position INTEGER NOT NULL, class_index INTEGER, sentiment_class TEXT, "
+    "sentiment_score REAL, confidence_percent REAL, confidence_bin INTEGER, theme_mask INTEGER NOT NULL, "
+    "review_title TEXT, review_text TEXT, PRIMARY KEY (run_id, position))",
+    "CREATE INDEX IF NOT EXISTS idx_reviews_rating ON reviews(run_id, class_index, sentiment_class)",
+    "CREATE INDEX IF NOT EXISTS idx_reviews_sentiment ON reviews(run_id, sentiment_class)",
+    # Temas normalizados (uma linha por review × tema); a chave primária indexa por tema
+    "CREATE TABLE IF NOT EXISTS review_themes ("
+    "run_id INTEGER NOT NULL, theme TEXT NOT NULL, position INTEGER NOT NULL, "
+    "PRIMARY KEY (run_id, theme, position)) WITHOUT ROWID",
+]
+
+def _connect(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    for statement in _SCHEMA:
+        conn.execute(statement)
+    return conn
+
+def start_run(source, path=DEFAULT_STORE_PATH):
+    conn = _connect(path)
+    try:
+        cursor = conn.execute("INSERT INTO runs(source, created_at) VALUES (?, ?)",
+                              (str(source), datetime.now(timezone.utc).isoformat(timespec="seconds")))
+        return cursor.lastrowid
+    finally:
+        conn.close()
+
+def _theme_masks(df):
+    if THEME_MASK_COLUMN in df:
+        return df[THEME_MASK_COLUMN].to_numpy(dtype=np.int64)
+    masks = np.zeros(len(df), dtype=np.int64)
+    rows, bits = theme_bits(df)
+    np.bitwise_or.at(masks, rows, np.left_shift(1, bits))
+    return masks
+
+# Valores da coluna como objetos Python, com None nos ausentes (NULL no banco)
+def _column_values(df, column):
+    if column not in df:
+        return [None] * len(df)
+    return df[column].astype(object).where(df[column].notna(), None).tolist()
+
+# Acrescenta as linhas de df (layout compacto ou com listas de temas; textos da arena são
+# decodificados bloco a bloco) à execução run_id, a partir da posição start
+def append_reviews(run_id, df, start=0, path=DEFAULT_STORE_PATH, store_texts=True):
+    registry = get_theme_registry()
+    conn = _connect(path)
+    try:
+        for offset in range(0, len(df), STORE_BATCH_ROWS):
+            chunk = df.iloc[offset:offset + STORE_BATCH_ROWS]
+            if store_texts:
+                chunk = decode_text_columns(chunk, TEXT_COLUMNS)
+            positions = np.arange(start + offset, start + offset + len(chunk))
+            confidence = chunk["confidence_percent"].to_numpy(dtype=np.float64)
+            masks = _theme_masks(chunk)
+            records = zip(
+                [run_id] * len(chunk), positions.tolist(),
+                _column_values(chunk, "class_index"),
+                _column_values(chunk, "sentiment_class"),
+                chunk["sentiment_score"].to_numpy(dtype=np.float64).tolist(),
+                confidence.tolist(), np.rint(confidence * 100).astype(np.int64).tolist(), masks.tolist(),
+                _column_values(chunk, "review_title") if store_texts else [None] * len(chunk),
+                _column_values(chunk, "review_text") if store_texts else [None] * len(chunk),
+            )
+            theme_rows = [(run_id, registry[bit][1], int(position))
+                          for bit in range(len(registry))
+                          for position in positions[(masks >> bit) & 1 == 1]]
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("INSERT INTO reviews VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", records)
+                conn.executemany("INSERT INTO review_themes VALUES (?, ?, ?)", theme_rows)
+                conn.execute("UPDATE runs SET rows = rows + ? WHERE run_id = ?", (len(chunk), run_id))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    finally:
+        conn.close()
+
+# Grava df inteiro como uma nova execução; devolve o run_id
+def save_run(df, source, path=DEFAULT_STORE_PATH, store_texts=True):
+    run_id = start_run(source, path)
+    append_reviews(run_id, df, path=path, store_texts=store_texts)
+    return run_id
+
+def list_runs(path=DEFAULT_STORE_PATH):
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=["run_id", "source", "created_at", "rows"])
+    conn = _connect(path)
+    try:
+        return pd.read_sql_query("SELECT run_id, source, created_at, rows FROM runs ORDER BY run_id DESC", conn)
+    finally:
+        conn.close()
+
+# Só as linhas com nota e sentimento conhecidos entram no cubo (como em aggregates.group_index)
+def _valid_groups_sql(table="reviews"):
+    ratings = ", ".join(str(rating) for rating in RATINGS)
+    sentiments = ", ".join(f"'{sentiment}'" for sentiment in SENTIMENTS)
+    return f"{table}.class_index IN ({ratings}) AND {table}.sentiment_class IN ({sentiments})"
+
+# Cubo de agregados (mesmo formato de aggregates.build_aggregates) calculado por consultas SQL
+def store_aggregates(run_id, path=DEFAULT_STORE_PATH):
+    agg = empty_aggregates()
+    rating_pos = {rating: i for i, rating in enumerate(RATINGS)}
+    sentiment_pos = {sentiment: j for j, sentiment in enumerate(SENTIMENTS)}
+    theme_pos = {theme: k for k, (_, theme) in enumerate(get_theme_registry())}
+    conn = _connect(path)
+    try:
+        agg["rows"] = conn.execute("SELECT COUNT(*) FROM reviews WHERE run_id = ?", (run_id,)).fetchone()[0]
+        histogram = conn.execute(
+            "SELECT class_index, sentiment_class, confidence_bin, COUNT(*) FROM reviews "
+            f"WHERE run_id = ? AND {_valid_groups_sql()} GROUP BY 1, 2, 3", (run_id,)
+        ).fetchall()
+        themes = conn.execute(
+            "SELECT r.class_index, r.sentiment_class, t.theme, COUNT(*) FROM review_themes t "
+            "JOIN reviews r ON r.run_id = t.run_id AND r.position = t.position "
+            f"WHERE t.run_id = ? AND {_valid_groups_sql('r')} "
+            "GROUP BY 1, 2, 3", (run_id,)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    if histogram:
+        rating, sentiment, bins, counts = zip(*histogram)
+        i = np.array([rating_pos[r] for r in rating])
+        j = np.array([sentiment_pos[s] for s in sentiment])
+        bins = np.clip(np.array(bins, dtype=np.int64), 0, CONFIDENCE_BINS - 1)
+        counts = np.array(counts, dtype=np.int64)
+        np.add.at(agg["confidence_hist"], (i, j, bins), counts)
+        np.add.at(agg["counts"], (i, j), counts)
+        # Somas a partir dos bins exatos, como em build_aggregates
+        np.add.at(agg["confidence_sum"], (i, j), counts * (bins / 100))
+        np.add.at(agg["confidence_sq_sum"], (i, j), counts * (bins / 100) ** 2)
+    for rating, sentiment, theme, count in themes:
+        if theme in theme_pos:
+            agg["theme_counts"][rating_pos[rating], sentiment_pos[sentiment], theme_pos[theme]] += count
+    return agg
+
+# Condição SQL de uma regra de rating_rules (nota → sentimentos aceitos)
+def _rule_sql(name):
+    clauses = [f"(class_index = {rating})" if accepted == ANY_SENTIMENT else
+               f"(class_index = {rating} AND sentiment_class IN ({', '.join(repr(s) for s in sorted(accepted))}))"
+               for rating, accepted in RATING_RULES[name].items()]
+    return " OR ".join(clauses)
+
+# Visão lado a lado das execuções: volume, % por sentimento, confiança média e precisão
+def compare_runs(run_ids=None, path=DEFAULT_STORE_PATH):
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    sentiment_columns = ", ".join(
+        f"AVG(r.sentiment_class = '{sentiment}') * 100 AS \"% {sentiment}\"" for sentiment in SENTIMENTS
+    )
+    where = ""
+    params = []
+    if run_ids:
+        where = f"WHERE u.run_id IN ({', '.join('?' * len(run_ids))})"
+        params = list(run_ids)
+    query = (
+        f"SELECT u.run_id, u.source, u.created_at, COUNT(r.position) AS reviews, {sentiment_columns}, "
+        "AVG(r.confidence_percent) AS confianca_media, "
+        f"AVG(CASE WHEN {_rule_sql('precision')} THEN 1.0 ELSE 0.0 END) AS precisao "
+        "FROM runs u LEFT JOIN reviews r ON r.run_id = u.run_id "
+        f"{where} GROUP BY u.run_id ORDER BY u.run_id"
+    )
+    conn = _connect(path)
+    try:
+        return pd.read_sql_query(query, conn, params=params)
+    finally:
+        conn.close()
+
+# Reviews filtradas por nota, sentimento e tema, paginadas (usa os índices do banco)
+def query_reviews(run_id, ratings=None, sentiments=None, themes=None, limit=20, offset=0, path=DEFAULT_STORE_PATH):
+    conditions = ["r.run_id = ?"]
+    params = [run_id]
+    for column, values in (("r.class_index", ratings), ("r.sentiment_class", sentiments)):
+        if values:
+            conditions.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    if themes:
+        conditions.append(
+            "r.position IN (SELECT position FROM review_themes WHERE run_id = r.run_id "
+            f"AND theme IN ({', '.join('?' * len(themes))}))"
+        )
+        params.extend(themes)
+    query = (
+        "SELECT r.position, r.review_title, r.review_text, r.class_index, r.sentiment_class, "
+        "r.sentiment_score, r.confidence_percent, r.theme_mask FROM reviews r "
+        f"WHERE {' AND '.join(conditions)} ORDER BY r.position LIMIT ? OFFSET ?"
+    )
+    conn = _connect(path)
+    try:
+        return pd.read_sql_query(query, conn, params=params + [limit, offset])
+    finally:
+        conn.close()
+
+# Amostra reprodutível de até sample_size reviews da execução (para os gráficos por review)
+def sample_reviews(run_id, sample_size=5_000, seed=42, path=DEFAULT_STORE_PATH):
+    conn = _connect(path)
+    try:
+        rows = conn.execute("SELECT rows FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        total = rows[0] if rows else 0
+        positions = np.sort(np.random.default_rng(seed).choice(total, size=min(sample_size, total), replace=False))
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS sample_positions (position INTEGER PRIMARY KEY)")
+        conn.execute("DELETE FROM sample_positions")
+        conn.executemany("INSERT INTO sample_positions VALUES (?)", ((int(p),) for p in positions))
+        return pd.read_sql_query(
+            "SELECT r.review_title, r.review_text, r.class_index, r.sentiment_class, r.sentiment_score, "
+            "r.confidence_percent, r.theme_mask FROM sample_positions s "
+            "JOIN reviews r ON r.run_id = ? AND r.position = s.position ORDER BY r.position",
+            conn, params=(run_id,)
+        )
+    finally:
+        conn.close()
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+# Motor de regras em tabelas: classes de sentimento, acertos por nota e heurísticas
+# de anomalia avaliados sobre colunas inteiras (NumPy), sem laços por linha.
+RATINGS = [1, 2, 3, 4, 5]
+SENTIMENTS = ["Positivo", "Neutro", "Negativo"]
+
+# Limiares do score para as classes de sentimento
+NEGATIVE_THRESHOLD = 0.52
+POSITIVE_THRESHOLD = 0.67
+
+# Aceita qualquer valor de sentimento na nota, inclusive ausente ou desconhecido
+ANY_SENTIMENT = "*"
+
+# Sentimentos aceitos para cada nota; notas fora da tabela nunca são aceitas
+RATING_RULES = {
+    # Precisão crua (calculate_precision)
+    "precision": {
+        1: {"Negativo"},
+        2: {"Negativo", "Neutro"},
+        3: {"Negativo", "Neutro", "Positivo"},
+        4: {"Positivo", "Neutro"},
+        5: {"Positivo"},
+    },
+    # Precisão limitada às notas com expectativa clara (nota 3 não conta)
+    "limited": {
+        1: {"Negativo"},
+        2: {"Negativo", "Neutro"},
+        4: {"Positivo", "Neutro"},
+        5: {"Positivo"},
+    },
+    # Heurística 1 das amostras: faixa flexível para nota × sentimento (nota 3 é zona cinzenta)
+    "reasonable": {
+        1: {"Negativo", "Neutro"},
+        2: {"Negativo", "Neutro"},
+        3: ANY_SENTIMENT,
+        4: {"Positivo", "Neutro"},
+        5: {"Positivo", "Neutro"},
+    },
+}
+
+# Sentimento esperado pela nota na matriz de confusão (aggregates.confusion_matrix); demais notas contam como Neutro
+EXPECTED_SENTIMENT = {1: "Negativo", 5: "Positivo"}
+DEFAULT_EXPECTED_SENTIMENT = "Neutro"
+
+# Heurística 2: confiança baixa (%)
+LOW_CONFIDENCE_THRESHOLD = 30
+
+# Heurística 3: score com sinal contrário ao da nota (nota → sinal proibido do score)
+DISCREPANCY_RULES = {5: -1, 1: 1}
+
+# Matrizes booleanas (nota × sentimento) com uma linha/coluna extra, sempre falsa,
+# para valores desconhecidos (código -1 do pd.Categorical)
+def _rule_table(rule):
+    table = np.zeros((len(RATINGS) + 1, len(SENTIMENTS) + 1), dtype=bool)
+    for rating, accepted in rule.items():
+        if accepted == ANY_SENTIMENT:
+            table[RATINGS.index(rating), :] = True
+            continue
+        for sentiment in accepted:
+            table[RATINGS.index(rating), SENTIMENTS.index(sentiment)] = True
+    return table
+
+RULE_TABLES = {name: _rule_table(rule) for name, rule in RATING_RULES.items()}
+
+# Posição de cada valor na lista de categorias; ausentes e valores fora da lista viram -1
+def rating_codes(ratings):
+    return pd.Index(RATINGS).get_indexer(ratings)
+
+def sentiment_codes(sentiments):
+    return pd.Index(SENTIMENTS).get_indexer(sentiments)
+
+# Avalia uma regra da tabela para colunas inteiras de notas e sentimentos
+def evaluate_rule(name, ratings, sentiments):
+    return RULE_TABLES[name][rating_codes(ratings), sentiment_codes(sentiments)]
+
+_SENTIMENT_LABELS = np.array(SENTIMENTS, dtype=object)
+
+# Classe de cada score pelos limiares (NaN fica como Neutro, como no classify_sentiment por linha original)
+def classify_sentiments(scores):
+    scores = np.asarray(scores, dtype=np.float64)
+    codes = np.full(len(scores), SENTIMENTS.index("Neutro"), dtype=np.int8)
+    codes[scores < NEGATIVE_THRESHOLD] = SENTIMENTS.index("Negativo")
+    codes[scores > POSITIVE_THRESHOLD] = SENTIMENTS.index("Positivo")
+    return _SENTIMENT_LABELS.take(codes)
+
+def low_confidence(confidence_percent):
+    return np.asarray(confidence_percent, dtype=np.float64) < LOW_CONFIDENCE_THRESHOLD
+
+def has_discrepancy(ratings, scores):
+    ratings = np.asarray(ratings)
+    signs = np.sign(np.asarray(scores, dtype=np.float64))
+    result = np.zeros(len(ratings), dtype=bool)
+    for rating, forbidden_sign in DISCREPANCY_RULES.items():
+        result |= (ratings == rating) & (signs == forbidden_sign)
+    return result
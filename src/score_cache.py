@@ -0,0 +1,100 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+# Cache persistente de scores VADER, endereçado pelo conteúdo de clean_text.
+# SQLite em modo WAL permite leitura/escrita simultânea por vários workers do Streamlit.
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "sentiment_scores.sqlite3")
+DEFAULT_MAX_ENTRIES = 2_000_000
+
+# Limite de parâmetros por consulta (margem abaixo do limite padrão do SQLite)
+_QUERY_BATCH = 900
+
+def _connect(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS scores ("
+        "key BLOB PRIMARY KEY, score REAL NOT NULL, last_used INTEGER NOT NULL)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scores_last_used ON scores(last_used)")
+    conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    return conn
+
+def _increment(conn, name, amount):
+    conn.execute(
+        "INSERT INTO stats(name, value) VALUES (?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+        (name, amount)
+    )
+
+# Chave = hash do texto limpo + versão do léxico/limiares
+def cache_key(text, version):
+    return hashlib.blake2b(f"{version}\0{text}".encode("utf-8"), digest_size=16).digest()
+
+# Busca os scores já conhecidos; retorna {texto: score} apenas para os acertos
+def get_cached_scores(texts, version, path=DEFAULT_CACHE_PATH):
+    keys = {cache_key(text, version): text for text in texts}
+    found = {}
+    now = time.time_ns()
+    conn = _connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        key_list = list(keys)
+        for start in range(0, len(key_list), _QUERY_BATCH):
+            batch = key_list[start:start + _QUERY_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(f"SELECT key, score FROM scores WHERE key IN ({placeholders})", batch).fetchall()
+            for key, score in rows:
+                found[keys[key]] = score
+            # Atualiza o instante de uso para a política LRU
+            conn.execute(f"UPDATE scores SET last_used = ? WHERE key IN ({placeholders})", [now, *batch])
+        _increment(conn, "hits", len(found))
+        _increment(conn, "misses", len(keys) - len(found))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return found
+
+# Grava novos scores e remove os menos usados recentemente acima do limite
+def store_scores(scores, version, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+    if not scores:
+        return
+    now = time.time_ns()
+    conn = _connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT OR REPLACE INTO scores(key, score, last_used) VALUES (?, ?, ?)",
+            ((cache_key(text, version), float(score), now) for text, score in scores.items())
+        )
+        excess = conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0] - max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM scores WHERE key IN (SELECT key FROM scores ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            _increment(conn, "evictions", excess)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+# Contadores acumulados (acertos, faltas, remoções) e número de entradas
+def cache_stats(path=DEFAULT_CACHE_PATH):
+    conn = _connect(path)
+    try:
+        stats = {"hits": 0, "misses": 0, "evictions": 0}
+        stats.update(dict(conn.execute("SELECT name, value FROM stats").fetchall()))
+        stats["entries"] = conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+    finally:
+        conn.close()
+    return stats
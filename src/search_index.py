@@ -0,0 +1,195 @@
+import math
+import os
+import re
+import numpy as np
+from preprocessor import preprocess_text, tokenize_clean_texts
+from text_arena import iter_text_chunks, DEFAULT_DECODE_CHUNK_ROWS
+from keyword_detector import THEME_MASK_COLUMN, get_theme_registry
+from aggregates import theme_bits
+from rules import RATINGS, SENTIMENTS, rating_codes, sentiment_codes
+
+# Índice invertido sobre clean_text para buscas por termos e "frases exatas", combinadas
+# com filtros de nota, sentimento e tema. O índice é uma lista de segmentos (um por lote
+# analisado); cada segmento guarda, por termo, as linhas e as posições dos tokens em arrays
+# NumPy ordenados, então uma consulta custa buscas binárias sobre os termos consultados.
+DEFAULT_PAGE_SIZE = 20
+
+PHRASE_PATTERN = re.compile(r'"([^"]*)"')
+
+# Início de cada termo nos arrays ordenados por ID: valores do termo t em [offsets[t], offsets[t + 1])
+def _term_offsets(sorted_ids, vocab_size):
+    offsets = np.zeros(vocab_size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sorted_ids, minlength=vocab_size), out=offsets[1:])
+    return offsets
+
+# Segmento do índice para as linhas de df; row_offset é a posição da primeira linha no
+# dataframe completo. tokens: fluxo de tokens de df (sem ele, é montado do clean_text).
+def build_index(df, tokens=None, row_offset=0):
+    if tokens is None:
+        tokens = tokenize_clean_texts(df["clean_text"])
+    ids = tokens["ids"]
+    vocab_size = len(tokens["vocab"])
+    token_rows = np.repeat(np.arange(len(df), dtype=np.int32), np.diff(tokens["offsets"]))
+
+    # Posições agrupadas por termo e crescentes dentro de cada um: ordena chaves (ID, posição)
+    # empacotadas em int64, bem mais rápido que um argsort estável sobre os IDs
+    keys = (ids.astype(np.int64) << 32) | np.arange(len(ids), dtype=np.int64)
+    keys.sort()
+    sorted_ids = (keys >> 32).astype(np.int32)
+    positions = keys & 0xFFFFFFFF
+    sorted_rows = token_rows[positions]
+
+    # Linhas de cada termo, sem repetição (um termo repetido na review conta uma vez)
+    first = np.ones(len(positions), dtype=bool)
+    first[1:] = (sorted_ids[1:] != sorted_ids[:-1]) | (sorted_rows[1:] != sorted_rows[:-1])
+
+    masks = np.zeros(len(df), dtype=np.uint32)
+    if THEME_MASK_COLUMN in df:
+        masks = df[THEME_MASK_COLUMN].to_numpy(dtype=np.uint32)
+    else:
+        mask_rows, bits = theme_bits(df)
+        np.bitwise_or.at(masks, mask_rows, (np.uint32(1) << bits.astype(np.uint32)))
+
+    return {
+        "row_offset": row_offset,
+        "rows": len(df),
+        "terms": {term: term_id for term_id, term in enumerate(tokens["vocab"])},
+        "row_offsets": _term_offsets(sorted_ids[first], vocab_size),
+        "term_rows": sorted_rows[first],
+        "position_offsets": _term_offsets(sorted_ids, vocab_size),
+        "positions": positions,
+        "token_rows": token_rows,
+        "ratings": rating_codes(df["class_index"]),
+        "sentiments": sentiment_codes(df["sentiment_class"]),
+        "theme_masks": masks,
+    }
+
+# Grava os arrays do segmento em arquivos .npy (prefixo prefix) e devolve o segmento lendo-os
+# por mapa de memória. O dicionário de termos vira um array ordenado de bytes (o clean_text só
+# tem letras ASCII) e o ID de cada termo, consultados por busca binária (ver _term_id).
+def _store_segment(segment, prefix):
+    vocab = np.array(list(segment["terms"]), dtype=bytes)
+    order = np.argsort(vocab)
+    arrays = {key: value for key, value in segment.items() if isinstance(value, np.ndarray)}
+    arrays.update(terms=vocab[order], term_ids=order.astype(np.int32))
+    stored = dict(segment)
+    for key, value in arrays.items():
+        path = f"{prefix}_{key}.npy"
+        np.save(path, value)
+        stored[key] = np.load(path, mmap_mode="r")
+    return stored
+
+# Índice em segmentos de chunk_rows linhas, lendo o clean_text bloco a bloco
+# (com a arena de textos, só um bloco de textos fica decodificado por vez).
+# Com directory, cada segmento é gravado nele e lido do disco: no modo arena o índice do
+# arquivo inteiro não fica na RAM (só o segmento em construção).
+def build_index_in_chunks(df, chunk_rows=DEFAULT_DECODE_CHUNK_ROWS, directory=None):
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+    segments = []
+    for start, texts in iter_text_chunks(df, "clean_text", chunk_rows):
+        segment = build_index(df.iloc[start:start + len(texts)], tokens=tokenize_clean_texts(texts), row_offset=start)
+        if directory is not None:
+            segment = _store_segment(segment, os.path.join(directory, str(len(segments))))
+        segments.append(segment)
+    return segments
+
+# Consulta → lista de frases (listas de termos); termos soltos são frases de um termo.
+# Os termos passam pela mesma limpeza do clean_text (stopwords somem da consulta).
+def parse_query(query):
+    phrases = [preprocess_text(phrase).split() for phrase in PHRASE_PATTERN.findall(query)]
+    phrases += [[term] for term in preprocess_text(PHRASE_PATTERN.sub(" ", query)).split()]
+    return [phrase for phrase in phrases if phrase]
+
+# Quais valores de queries estão no array ordenado values (busca binária)
+def _contains(values, queries):
+    found = np.searchsorted(values, queries)
+    inside = found < len(values)
+    inside[inside] = values[found[inside]] == queries[inside]
+    return inside
+
+# ID do termo no segmento (None se ausente): dicionário em memória ou array ordenado em disco
+def _term_id(segment, term):
+    terms = segment["terms"]
+    if isinstance(terms, dict):
+        return terms.get(term)
+    key = term.encode("utf-8")
+    found = int(np.searchsorted(terms, key))
+    if found < len(terms) and terms[found] == key:
+        return int(segment["term_ids"][found])
+    return None
+
+def _term_slice(segment, offsets_key, values_key, term_id):
+    offsets = segment[offsets_key]
+    return segment[values_key][offsets[term_id]:offsets[term_id + 1]]
+
+# Linhas (ordenadas) do segmento que contêm a frase
+def _phrase_rows(segment, phrase):
+    term_ids = [_term_id(segment, term) for term in phrase]
+    if any(term_id is None for term_id in term_ids):
+        return np.zeros(0, dtype=np.int32)
+    if len(term_ids) == 1:
+        return _term_slice(segment, "row_offsets", "term_rows", term_ids[0])
+
+    # Âncora no termo mais raro; os demais são conferidos na posição relativa esperada
+    postings = [_term_slice(segment, "position_offsets", "positions", term_id) for term_id in term_ids]
+    anchor = min(range(len(postings)), key=lambda k: len(postings[k]))
+    starts = postings[anchor] - anchor
+    for k, term_positions in enumerate(postings):
+        if k != anchor:
+            starts = starts[_contains(term_positions, starts + k)]
+    # A frase não pode atravessar o limite entre duas reviews
+    token_rows = segment["token_rows"]
+    starts = starts[token_rows[starts] == token_rows[starts + len(phrase) - 1]]
+    return np.unique(token_rows[starts])
+
+# Tabela de códigos aceitos por um filtro; a posição extra (código -1, valor desconhecido) é falsa
+def _accepted_codes(selected, categories):
+    table = np.zeros(len(categories) + 1, dtype=bool)
+    table[[categories.index(value) for value in selected if value in categories]] = True
+    return table
+
+def _theme_filter_mask(themes):
+    bits = [bit for bit, (_, theme) in enumerate(get_theme_registry()) if theme in set(themes)]
+    return np.uint32(sum(1 << bit for bit in bits))
+
+def _segment_matches(segment, phrases, ratings, sentiments, themes):
+    rows = None
+    for phrase in phrases:
+        phrase_rows = _phrase_rows(segment, phrase)
+        rows = phrase_rows if rows is None else rows[_contains(phrase_rows, rows)]
+        if len(rows) == 0:
+            return rows
+
+    # Filtros: dentro de cada campo, qualquer valor selecionado; entre campos, todos.
+    # Sem termos na consulta, os filtros são avaliados direto sobre as colunas do segmento.
+    def column(name):
+        return segment[name] if rows is None else segment[name][rows]
+
+    keep = np.ones(segment["rows"] if rows is None else len(rows), dtype=bool)
+    if ratings:
+        keep &= _accepted_codes(ratings, RATINGS)[column("ratings")]
+    if sentiments:
+        keep &= _accepted_codes(sentiments, SENTIMENTS)[column("sentiments")]
+    if themes:
+        keep &= (column("theme_masks") & _theme_filter_mask(themes)) != 0
+    return np.flatnonzero(keep) if rows is None else rows[keep]
+
+# Busca paginada: todas as frases da consulta (E) + filtros. Devolve o total de reviews
+# encontradas e as posições (no dataframe completo) das linhas da página pedida (0 = primeira).
+# Uma consulta não vazia que a limpeza esvazia (só stopwords, números ou pontuação) não encontra nada.
+def search(index, query="", ratings=None, sentiments=None, themes=None, page=0, page_size=DEFAULT_PAGE_SIZE):
+    phrases = parse_query(query)
+    if query.strip() and not phrases:
+        index = []
+    matches = [segment["row_offset"] + _segment_matches(segment, phrases, ratings, sentiments, themes).astype(np.int64)
+               for segment in index]
+    rows = np.concatenate(matches) if matches else np.zeros(0, dtype=np.int64)
+    start = page * page_size
+    return {
+        "total": len(rows),
+        "pages": math.ceil(len(rows) / page_size),
+        "page": page,
+        "rows": rows[start:start + page_size],
+        "phrases": phrases,
+    }
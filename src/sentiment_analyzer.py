@@ -1,52 +1,108 @@
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from preprocessor import preprocess_text
+from preprocessor import preprocess_series, VADER_LEXICON_SNAPSHOT_PATH
+import score_cache
+from instrumentation import stage
+from rules import NEGATIVE_THRESHOLD, POSITIVE_THRESHOLD, classify_sentiments, evaluate_rule
 
-def classify_sentiment(score):
-    if score < 0.52:
-        return "Negativo"
-    elif score > 0.67:
-        return "Positivo"
-    else:
-        return "Neutro"
+# Modo paralelo: abaixo deste número de textos o custo de iniciar processos não compensa
+PARALLEL_MIN_ROWS = 20_000
+PARALLEL_CHUNK_SIZE = 5_000
 
+_analyzer = None
+_score_version = None
+
+# Analisador VADER criado na primeira chamada a partir do léxico local versionado
+def get_analyzer():
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = SentimentIntensityAnalyzer(lexicon_file=VADER_LEXICON_SNAPSHOT_PATH)
+    return _analyzer
+
+# Versão do cálculo de score: hash do léxico + limiares (invalida o cache quando mudam)
+def get_score_version():
+    global _score_version
+    if _score_version is None:
+        with open(VADER_LEXICON_SNAPSHOT_PATH, "rb") as f:
+            lexicon_hash = hashlib.sha1(f.read()).hexdigest()[:12]
+        _score_version = f"vader-{lexicon_hash}|{NEGATIVE_THRESHOLD}-{POSITIVE_THRESHOLD}"
+    return _score_version
+
+# Acertos avaliados na coluna inteira pela tabela de regras (sem apply por linha)
 def calculate_precision(df):
-    def is_correct_prediction(row):
-        predicted = row["sentiment_class"]
-        real = row["class_index"]
-        
-        if real == 1:
-            return predicted == "Negativo"
-        elif real == 2:
-            return predicted in ["Negativo", "Neutro"]
-        elif real == 3:
-            return predicted in ["Negativo", "Neutro", "Positivo"]
-        elif real == 4:
-            return predicted in ["Positivo", "Neutro"]
-        elif real == 5:
-            return predicted == "Positivo"
-        return False
-    
-    return df.apply(is_correct_prediction, axis=1).mean()
-
-def is_correct_prediction_limited(rating, sentiment):
-    if rating == 1 and sentiment == "Negativo":
-        return True
-    if rating == 5 and sentiment == "Positivo":
-        return True
-    if rating == 4 and sentiment in {"Positivo", "Neutro"}:
-        return True
-    if rating == 2 and sentiment in {"Negativo", "Neutro"}:
-        return True
-    return False
-
-
-def analyze_sentiment(df):
-    analyzer = SentimentIntensityAnalyzer()
-    df["clean_text"] = df["review_text"].apply(preprocess_text)
-    df["sentiment_score"] = df["clean_text"].apply(lambda x: analyzer.polarity_scores(x)["compound"])
-    df["sentiment_class"] = df["sentiment_score"].apply(classify_sentiment)
-    df["confidence_percent"] = (df["sentiment_score"].abs() * 100).round(2)
+    if df.empty:
+        return float("nan")
+    return float(evaluate_rule("precision", df["class_index"], df["sentiment_class"]).mean())
+
+# Inicialização de cada processo do pool: um analisador VADER por worker
+def _init_worker():
+    get_analyzer()
+
+def _score_chunk(texts):
+    analyzer = get_analyzer()
+    return [analyzer.polarity_scores(text)["compound"] for text in texts]
+
+# Scores compostos de uma lista de textos, em série ou em um pool de processos.
+# executor.map preserva a ordem dos blocos, logo a ordem das linhas é mantida.
+def compute_scores(texts, workers=None, chunk_size=PARALLEL_CHUNK_SIZE):
+    texts = list(texts)
+    if not workers or workers <= 1 or len(texts) < PARALLEL_MIN_ROWS:
+        return _score_chunk(texts)
+
+    chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        return [score for chunk_scores in executor.map(_score_chunk, chunks) for score in chunk_scores]
+
+# Scores compostos do VADER; com cache_path, só os textos ainda não vistos são calculados
+def score_texts(texts, cache_path=None, workers=None, chunk_size=PARALLEL_CHUNK_SIZE):
+    if cache_path is None:
+        return pd.Series(compute_scores(texts, workers, chunk_size), index=texts.index, dtype=float)
+
+    version = get_score_version()
+    unique_texts = texts.unique()
+    scores = score_cache.get_cached_scores(unique_texts, version, cache_path)
+    missing = [text for text in unique_texts if text not in scores]
+    new_scores = dict(zip(missing, compute_scores(missing, workers, chunk_size)))
+    score_cache.store_scores(new_scores, version, cache_path)
+    scores.update(new_scores)
+    return texts.map(scores)
+
+# Códigos de cada texto e textos únicos (duplicatas exatas compartilham o código)
+def deduplicate_texts(texts):
+    codes, unique_texts = pd.factorize(texts, use_na_sentinel=False)
+    return codes, pd.Series(unique_texts, dtype=object)
+
+def duplication_ratio(rows, unique_rows):
+    return 1 - unique_rows / rows if rows else 0.0
+
+# workers > 1 ativa o modo paralelo (opcional); chunk_size define o tamanho dos blocos enviados.
+# Cada texto limpo distinto é pontuado uma vez e o score é replicado para as duplicatas;
+# df.attrs["duplicate_rows"] e df.attrs["duplication_ratio"] registram o trabalho poupado.
+# preprocessed=True: df já traz o clean_text (ex.: montado junto com o fluxo de tokens em
+# pipeline.analyze_reviews_with_tokens) e a limpeza não é refeita aqui; sem a coluna, ValueError.
+# duplicates: (códigos, textos únicos) de deduplicate_texts já calculados para o clean_text,
+# para que a etapa de temas reaproveite a mesma deduplicação.
+def analyze_sentiment(df, cache_path=None, workers=None, chunk_size=PARALLEL_CHUNK_SIZE, preprocessed=False,
+                      duplicates=None):
+    if not preprocessed:
+        with stage("preprocess_text", rows=len(df)):
+            df["clean_text"] = preprocess_series(df["review_text"])
+    elif "clean_text" not in df:
+        raise ValueError("preprocessed=True exige a coluna clean_text no dataframe")
+    if duplicates is None:
+        with stage("deduplicate", rows=len(df)):
+            duplicates = deduplicate_texts(df["clean_text"])
+    codes, unique_texts = duplicates
+    df.attrs["duplicate_rows"] = len(df) - len(unique_texts)
+    df.attrs["duplication_ratio"] = duplication_ratio(len(df), len(unique_texts))
+    with stage("vader_scoring", rows=len(unique_texts)):
+        unique_scores = score_texts(unique_texts, cache_path, workers, chunk_size).to_numpy(dtype=float)
+        df["sentiment_score"] = unique_scores[codes]
+        df["sentiment_class"] = classify_sentiments(df["sentiment_score"])
+        df["confidence_percent"] = (df["sentiment_score"].abs() * 100).round(2)
     
-    precision = calculate_precision(df)
+    with stage("calculate_precision", rows=len(df)):
+        precision = calculate_precision(df)
     return df, precision
@@ -0,0 +1,167 @@
+import hashlib
+import mmap
+import os
+import shutil
+import time
+import uuid
+import numpy as np
+import pandas as pd
+
+# Arena de textos em disco (opcional): os textos ficam concatenados em UTF-8 em um arquivo
+# mapeado em memória e o dataframe guarda, por coluna de texto, só a posição inicial e o
+# tamanho em bytes de cada texto. Os textos são decodificados apenas quando uma visualização
+# exibe a review ou uma etapa os lê (em blocos), então o número de reviews não fica limitado
+# pela memória ocupada pelos objetos str.
+TEXT_COLUMNS = ("review_title", "review_text", "clean_text")
+ARENA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "arena")
+# Chave em df.attrs com o caminho da arena das colunas de posições
+ARENA_ATTR = "text_arena"
+DEFAULT_DECODE_CHUNK_ROWS = 100_000
+# Arenas não tocadas há mais que isso (sessões abandonadas) são apagadas por remove_stale_arenas
+ARENA_MAX_AGE_SECONDS = 6 * 60 * 60
+
+_arenas = {}
+
+def offset_column(column):
+    return f"{column}_offset"
+
+def length_column(column):
+    return f"{column}_length"
+
+# Um arquivo por execução: hash do caminho absoluto da entrada mais um id da execução, para que
+# sessões diferentes (ou o mesmo nome de arquivo em pastas diferentes) nunca compartilhem uma arena
+def arena_path(filepath, run_id=None, arena_dir=ARENA_DIR):
+    source = hashlib.sha1(os.path.abspath(filepath).encode("utf-8")).hexdigest()[:12]
+    run_id = run_id or uuid.uuid4().hex
+    return os.path.join(arena_dir, f"{os.path.basename(filepath)}-{source}-{run_id}.arena")
+
+# Arquivo só de acréscimos (nunca truncado: dataframes já gravados continuam lendo suas posições);
+# a leitura usa um mapa de memória refeito quando o arquivo cresce. Tamanho -1 marca valor ausente (NaN).
+class TextArena:
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._writer = open(path, "ab")
+        self._reader = None
+        self._map = None
+
+    def append(self, texts):
+        texts = pd.Series(texts, dtype=object)
+        missing = texts.isna().to_numpy()
+        encoded = [b"" if is_missing else str(text).encode("utf-8") for text, is_missing in zip(texts, missing)]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        start = self._writer.tell()
+        self._writer.write(b"".join(encoded))
+        self._writer.flush()
+        offsets = start + np.cumsum(lengths) - lengths
+        return offsets, np.where(missing, -1, lengths).astype(np.int32)
+
+    def _mapped(self, end):
+        if self._map is None or end > len(self._map):
+            self.close_map()
+            self._reader = open(self.path, "rb")
+            self._map = mmap.mmap(self._reader.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def read(self, offsets, lengths):
+        offsets = np.asarray(offsets, dtype=np.int64)
+        lengths = np.asarray(lengths, dtype=np.int64)
+        if len(offsets) == 0 or lengths.max() <= 0:
+            return [None if length < 0 else "" for length in lengths.tolist()]
+        data = self._mapped(int((offsets + np.maximum(lengths, 0)).max()))
+        return [None if length < 0 else data[offset:offset + length].decode("utf-8")
+                for offset, length in zip(offsets.tolist(), lengths.tolist())]
+
+    def close_map(self):
+        if self._map is not None:
+            self._map.close()
+            self._reader.close()
+            self._map = self._reader = None
+
+    def close(self):
+        self.close_map()
+        self._writer.close()
+        _arenas.pop(self.path, None)
+
+# Arena aberta uma única vez por caminho (escrita e leitura compartilham o objeto)
+def open_arena(path):
+    arena = _arenas.get(path)
+    if arena is None:
+        arena = _arenas[path] = TextArena(path)
+    return arena
+
+# Diretório dos arquivos derivados da arena (ex.: índice de busca em disco), apagado junto com ela
+def arena_index_dir(path):
+    return path + ".index"
+
+# Marca a arena como em uso: a limpeza considera a idade do último toque
+def touch_arena(path):
+    if os.path.exists(path):
+        os.utime(path)
+
+# Apaga a arena de uma execução cujas linhas não são mais usadas por nenhum dataframe
+def remove_arena(path):
+    arena = _arenas.get(path)
+    if arena is not None:
+        arena.close()
+    if os.path.exists(path):
+        os.remove(path)
+    shutil.rmtree(arena_index_dir(path), ignore_errors=True)
+
+# Apaga as arenas não tocadas há mais de max_age segundos (fechando os arquivos abertos delas)
+# e os índices em disco que ficaram sem arena. Devolve os caminhos das arenas apagadas.
+def remove_stale_arenas(arena_dir=ARENA_DIR, max_age=ARENA_MAX_AGE_SECONDS):
+    if not os.path.isdir(arena_dir):
+        return []
+    removed = []
+    now = time.time()
+    for name in os.listdir(arena_dir):
+        path = os.path.join(arena_dir, name)
+        if name.endswith(".arena"):
+            try:
+                stale = now - os.path.getmtime(path) > max_age
+            except FileNotFoundError:
+                continue
+            if stale:
+                remove_arena(path)
+                removed.append(path)
+        elif name.endswith(".index") and not os.path.exists(path[:-len(".index")]):
+            shutil.rmtree(path, ignore_errors=True)
+    return removed
+
+# Move as colunas de texto de df para a arena: cada uma vira <coluna>_offset (int64) e
+# <coluna>_length (int32), e df.attrs guarda o caminho da arena
+def store_text_columns(df, arena, columns=TEXT_COLUMNS):
+    for column in [column for column in columns if column in df]:
+        offsets, lengths = arena.append(df[column])
+        position = df.columns.get_loc(column)
+        df = df.drop(columns=column)
+        df.insert(position, offset_column(column), offsets)
+        df.insert(position + 1, length_column(column), lengths)
+    df.attrs[ARENA_ATTR] = arena.path
+    return df
+
+def arena_text_columns(df):
+    return [column for column in TEXT_COLUMNS if offset_column(column) in df]
+
+def _decode(df, arena, column):
+    return pd.Series(arena.read(df[offset_column(column)], df[length_column(column)]), index=df.index, dtype=object)
+
+# Cópia de df com os textos decodificados da arena. Sem colunas de posições, devolve df como está.
+# Use em recortes pequenos (o que vai para a tela); para ler tudo, veja iter_text_chunks.
+def decode_text_columns(df, columns=None):
+    stored = [column for column in arena_text_columns(df) if columns is None or column in columns]
+    if not stored or ARENA_ATTR not in df.attrs:
+        return df
+    arena = open_arena(df.attrs[ARENA_ATTR])
+    decoded = df.assign(**{column: _decode(df, arena, column) for column in stored})
+    return decoded.drop(columns=[name for column in stored for name in (offset_column(column), length_column(column))])
+
+# Textos de uma coluna em blocos de chunk_rows linhas: (posição da primeira linha, série de textos)
+def iter_text_chunks(df, column, chunk_rows=DEFAULT_DECODE_CHUNK_ROWS):
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        if column in chunk:
+            yield start, chunk[column]
+        else:
+            yield start, _decode(chunk, open_arena(df.attrs[ARENA_ATTR]), column)
@@ -1,58 +1,85 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sentiment_analyzer import is_correct_prediction_limited
-
-def clean_data_for_pie_chart(df, sentiment_class, theme_column, exclude_theme=None):
-    cleaned_df = df.dropna(subset=[theme_column])
-    sentiment_df = cleaned_df[cleaned_df["sentiment_class"] == sentiment_class]
-    exploded_themes = sentiment_df[theme_column].explode()
-    if exclude_theme:
-        exploded_themes = exploded_themes[exploded_themes != exclude_theme]
-    theme_counts = exploded_themes.value_counts()
-    theme_counts = theme_counts[theme_counts > 0]
-    return theme_counts
-
-def display_visualizations(df, precision):  
+import aggregates as agg_views
+import rules
+import figure_cache
+from instrumentation import instrumented
+from keyword_detector import get_theme_registry
+from search_index import search
+from text_arena import arena_text_columns, decode_text_columns
+
+# Acima deste número de reviews, os gráficos de pontos usam o modo para grandes volumes:
+# boxplot a partir dos quantis dos agregados e apenas uma amostra estratificada dos pontos
+LARGE_DATA_THRESHOLD = 50_000
+MAX_POINTS_PER_GROUP = 500
+POINT_SAMPLE_SEED = 42
+# Com os textos na arena em disco, tabelas longas de reviews exibem (e decodificam) no máximo estas linhas
+MAX_ARENA_DISPLAY_ROWS = 1_000
+
+# Até max_points linhas por grupo, escolhidas com semente fixa (custo O(n), sem ordenar)
+def stratified_sample(df, column, max_points=MAX_POINTS_PER_GROUP, seed=POINT_SAMPLE_SEED):
+    shuffled = df.sample(frac=1, random_state=seed)
+    return shuffled[shuffled.groupby(column).cumcount() < max_points]
+
+# Exibe um gráfico a partir do cache de figuras (draw só roda quando a chave é nova)
+def show_figure(key, draw):
+    st.image(figure_cache.get_or_render(key, draw), width="stretch")
+
+# Caixas de boxplot a partir das estatísticas do cubo (uma cor por caixa)
+def draw_boxes(ax, box_stats, colors, showfliers=True):
+    boxes = ax.bxp(box_stats, positions=range(len(box_stats)), showfliers=showfliers, patch_artist=True,
+                   medianprops={"color": ".15"}, flierprops={"marker": "d", "markerfacecolor": ".15", "markersize": 4})
+    for box, color in zip(boxes["boxes"], colors):
+        box.set_facecolor(color)
+    ax.set_xticks(range(len(box_stats)), [stats["label"] for stats in box_stats])
+
+# aggregates: cubo já calculado (modo streaming/incremental); sem ele, é montado a partir de df.
+# Os gráficos saem do cubo; df só é usado para exibir reviews individuais.
+@instrumented()
+def display_visualizations(df, precision, aggregates=None):  
+    if aggregates is None:
+        aggregates = agg_views.build_aggregates(df)
+
     display_introduction()
 
     
     # Mostrar exemplos
-    display_review_samples(df)
+    display_review_samples(df, aggregates)
 
   
 
     # Mostrar distribuição de sentimentos
-    display_sentiment_distribution(df)
-    display_percentages(df)
+    display_sentiment_distribution(aggregates)
+    display_percentages(aggregates)
     
     # Mostrar cruzamento de sentimento vs nota
-    display_sentiment_vs_rating(df)
+    display_sentiment_vs_rating(aggregates)
 
     
     # Mostrar distribuição de confiança
-    display_confidence_distribution(df)
+    display_confidence_distribution(aggregates)
 
-    display_confidence_by_rating(df)
+    display_confidence_by_rating(df, aggregates)
 
-    display_sentiment_bubble_chart(df)
+    display_sentiment_bubble_chart(aggregates)
     
     # Mostrar temas
-    display_theme_distributions(df)
+    display_theme_distributions(aggregates)
     
    
     # Mostrar reviews negativas
-    display_negative_reviews(df)
+    display_negative_reviews(df, aggregates)
     
     # Mostrar sugestões
 
 
     display_precision_info(precision)
 
-    display_model_performance_analysis(df)
+    display_model_performance_analysis(aggregates)
 
+@instrumented()
 def display_introduction():
     """Mostra a introdução do programa e explica seu propósito."""
     st.title("📊 Análise de Sentimento em Reviews de Produtos")
@@ -158,6 +185,7 @@ def display_introduction():
                 st.markdown(example["explanation"], unsafe_allow_html=True)
 
 
+@instrumented()
 def display_precision_info(precision):
     st.markdown("---")
     
@@ -231,23 +259,27 @@ def display_precision_info(precision):
     
     st.markdown("---")
 
-def display_sentiment_distribution(df):
+@instrumented()
+def display_sentiment_distribution(aggregates):
     st.subheader("🌟 Distribuição por Nota (class_index)")
-    class_counts = df["class_index"].value_counts().sort_index()
+    class_counts = agg_views.class_counts(aggregates)
     st.bar_chart(class_counts)
 
     st.markdown("---")
     st.subheader("📊 Distribuição de Sentimentos")
-    st.bar_chart(df["sentiment_class"].value_counts())
+    st.bar_chart(agg_views.sentiment_counts(aggregates))
 
-    class_counts = df["class_index"].value_counts().sort_index()
     st.subheader("🥧 Distribuição Percentual das Notas")
     class_percent = class_counts / class_counts.sum() * 100
-    fig_pie, ax_pie = plt.subplots()
-    ax_pie.pie(class_percent, labels=class_percent.index, autopct='%1.1f%%', startangle=90, colors=sns.color_palette("pastel"))
-    ax_pie.set_title("Distribuição das Notas (em %)")
-    ax_pie.axis('equal')
-    st.pyplot(fig_pie)
+
+    def draw_pie():
+        fig_pie, ax_pie = plt.subplots()
+        ax_pie.pie(class_percent, labels=class_percent.index, autopct='%1.1f%%', startangle=90, colors=sns.color_palette("pastel"))
+        ax_pie.set_title("Distribuição das Notas (em %)")
+        ax_pie.axis('equal')
+        return fig_pie
+
+    show_figure(("class_pie", figure_cache.aggregates_fingerprint(aggregates)), draw_pie)
 
     # Exibir explicação sobre as distribuições usando expander
     with st.expander("📌 Entenda estes gráficos"):
@@ -277,16 +309,21 @@ def display_sentiment_distribution(df):
         """)
     st.markdown("---")
 
-def display_sentiment_vs_rating(df):
+@instrumented()
+def display_sentiment_vs_rating(aggregates):
     st.subheader("🔄 Cruzamento: Sentimento vs Nota")
-    cross_tab = pd.crosstab(df["class_index"], df["sentiment_class"])
+    cross_tab = agg_views.crosstab(aggregates)
     st.dataframe(cross_tab)
 
     st.subheader("📈 Heatmap: Sentimento vs Nota")
-    fig, ax = plt.subplots()
-    sns.heatmap(cross_tab, annot=True, fmt="d", cmap="YlOrBr", ax=ax)
-    ax.set_title("Distribuição entre Notas e Sentimentos")
-    st.pyplot(fig)
+
+    def draw_heatmap():
+        fig, ax = plt.subplots()
+        sns.heatmap(cross_tab, annot=True, fmt="d", cmap="YlOrBr", ax=ax)
+        ax.set_title("Distribuição entre Notas e Sentimentos")
+        return fig
+
+    show_figure(("rating_heatmap", figure_cache.aggregates_fingerprint(aggregates)), draw_heatmap)
 
     # Explicação dentro de um expander com texto simplificado
     with st.expander("📌 Como interpretar estes dados"):
@@ -324,75 +361,108 @@ def display_sentiment_vs_rating(df):
     st.markdown("---")
 
 
-def display_confidence_distribution(df):
+@instrumented()
+def display_confidence_distribution(aggregates):
     st.subheader("📏 Distribuição de Reviews por Faixa de Confiança na Analise Sentimental")
+    aggregates_key = figure_cache.aggregates_fingerprint(aggregates)
 
-    # Definir faixas de confiança
-    bins = [0, 20, 40, 60, 80, 100]
-    labels = ["0-20%", "21-40%", "41-60%", "61-80%", "81-100%"]
-    df["confidence_range"] = pd.cut(df["confidence_percent"], bins=bins, labels=labels, include_lowest=True)
-    
-    # Contagem por faixa
-    confidence_counts = df["confidence_range"].value_counts().sort_index()
+    def draw_ranges():
+        # Definir faixas de confiança
+        bins = [0, 20, 40, 60, 80, 100]
+        labels = ["0-20%", "21-40%", "41-60%", "61-80%", "81-100%"]
+
+        # Contagem por faixa
+        confidence_counts = agg_views.confidence_range_counts(aggregates, bins, labels)
 
-    # Plot
-    fig_conf, ax_conf = plt.subplots()
-    sns.barplot(x=confidence_counts.index, y=confidence_counts.values, palette="Blues_d", ax=ax_conf)
-    ax_conf.set_title("Quantidade de Reviews por Faixa de Confiança (%)")
-    ax_conf.set_xlabel("Faixa de Confiança")
-    ax_conf.set_ylabel("Número de Reviews")
-    st.pyplot(fig_conf)
+        # Plot
+        fig_conf, ax_conf = plt.subplots()
+        sns.barplot(x=confidence_counts.index, y=confidence_counts.values, palette="Blues_d", ax=ax_conf)
+        ax_conf.set_title("Quantidade de Reviews por Faixa de Confiança (%)")
+        ax_conf.set_xlabel("Faixa de Confiança")
+        ax_conf.set_ylabel("Número de Reviews")
+        return fig_conf
+
+    show_figure(("confidence_ranges", aggregates_key), draw_ranges)
 
     # Histograma da confiança
     st.subheader("📊 Histograma da Confiança da Análise de Sentimento")
-    fig_hist, ax_hist = plt.subplots()
-    sns.histplot(df["confidence_percent"], bins=20, kde=True, color="skyblue", ax=ax_hist)
-    ax_hist.set_title("Distribuição de Confiança (Score de Sentimento)")
-    ax_hist.set_xlabel("Confiança (%)")
-    ax_hist.set_ylabel("Número de Reviews")
-    st.pyplot(fig_hist)
+
+    def draw_histogram():
+        # Cada valor distinto de confiança entra uma vez, com peso igual ao número de reviews
+        values, counts = agg_views.confidence_values(aggregates)
+        fig_hist, ax_hist = plt.subplots()
+        sns.histplot(x=values, weights=counts, bins=20, kde=True, color="skyblue", ax=ax_hist)
+        ax_hist.set_title("Distribuição de Confiança (Score de Sentimento)")
+        ax_hist.set_xlabel("Confiança (%)")
+        ax_hist.set_ylabel("Número de Reviews")
+        return fig_hist
+
+    show_figure(("confidence_histogram", aggregates_key), draw_histogram)
 
     # Boxplot de confiança por classe
     st.subheader("📦 Boxplot: Confiança por Classe de Sentimento")
-    fig_box, ax_box = plt.subplots()
-    sns.boxplot(x="sentiment_class", y="confidence_percent", data=df, palette="Set2", ax=ax_box)
-    ax_box.set_title("Variação da Confiança por Sentimento")
-    ax_box.set_xlabel("Classe de Sentimento")
-    ax_box.set_ylabel("Confiança (%)")
-    st.pyplot(fig_box)
+
+    def draw_boxplot():
+        box_stats = agg_views.confidence_box_stats(aggregates, by="sentiment", fliers=True)
+        fig_box, ax_box = plt.subplots()
+        draw_boxes(ax_box, box_stats, sns.color_palette("Set2"))
+        ax_box.set_title("Variação da Confiança por Sentimento")
+        ax_box.set_xlabel("Classe de Sentimento")
+        ax_box.set_ylabel("Confiança (%)")
+        return fig_box
+
+    show_figure(("confidence_by_sentiment", aggregates_key), draw_boxplot)
    
 
-def display_confidence_by_rating(df):
+@instrumented()
+def display_confidence_by_rating(df, aggregates):
     st.subheader("🎯 Confiabilidade da Análise por Nota")
-    
-    # Criando o gráfico
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
-    # Boxplot da confiança por nota
-    sns.boxplot(x='class_index', y='confidence_percent', data=df, ax=ax)
-    
-    # Adicionando pontos individuais
-    sns.stripplot(x='class_index', y='confidence_percent', data=df, 
-                 size=4, color='.3', alpha=0.3, ax=ax)
-    
-    ax.set_title("Confiabilidade da Análise por Nota")
-    ax.set_xlabel("Nota (1-5)")
-    ax.set_ylabel("Confiança na Análise (%)")
-    
-    # Adicionar linha média
-    overall_mean = df['confidence_percent'].mean()
-    ax.axhline(y=overall_mean, color='r', linestyle='--', label=f'Média Geral: {overall_mean:.1f}%')
-    ax.legend()
-    
-    st.pyplot(fig)
-    
+    box_stats = agg_views.confidence_box_stats(aggregates, by="rating")
+    ratings = [stats["label"] for stats in box_stats]
+
+    # Acima do limite, os pontos individuais são uma amostra estratificada por nota
+    points = df[["class_index", "confidence_percent"]]
+    sampled = len(points) > LARGE_DATA_THRESHOLD
+    if sampled:
+        points = stratified_sample(points, "class_index")
+
+    def draw():
+        # Criando o gráfico
+        fig, ax = plt.subplots(figsize=(10, 6))
+
+        # Boxplot da confiança por nota, a partir dos quantis exatos do cubo
+        draw_boxes(ax, box_stats, [sns.color_palette()[0]] * len(box_stats), showfliers=False)
+
+        # Adicionando pontos individuais
+        sns.stripplot(x='class_index', y='confidence_percent', data=points, order=ratings,
+                     size=4, color='.3', alpha=0.3, ax=ax)
+
+        ax.set_title("Confiabilidade da Análise por Nota")
+        ax.set_xlabel("Nota (1-5)")
+        ax.set_ylabel("Confiança na Análise (%)")
+
+        # Adicionar linha média
+        overall_mean = agg_views.mean_confidence(aggregates)
+        ax.axhline(y=overall_mean, color='r', linestyle='--', label=f'Média Geral: {overall_mean:.1f}%')
+        ax.legend()
+        return fig
+
+    points_key = figure_cache.dataframe_fingerprint(points, ["class_index", "confidence_percent"])
+    show_figure(("confidence_by_rating", figure_cache.aggregates_fingerprint(aggregates), points_key), draw)
+    if sampled or len(df) < aggregates["rows"]:
+        st.caption(f"Caixas calculadas sobre todas as {aggregates['rows']} reviews; "
+                   f"pontos exibidos: {len(points)} reviews.")
+
     # Estatísticas resumidas
     st.markdown("### 📊 Estatísticas de Confiabilidade por Nota")
-    confidence_stats = df.groupby('class_index')['confidence_percent'].agg(['mean', 'median', 'std', 'min', 'max'])
+    confidence_stats = agg_views.confidence_stats_by_rating(aggregates)
     confidence_stats.columns = ['Média', 'Mediana', 'Desvio Padrão', 'Mínimo', 'Máximo']
     confidence_stats = confidence_stats.round(2)
     st.dataframe(confidence_stats)
 
+    display_confidence_by_rating_help()
+
+def display_confidence_by_rating_help():
     # Explicação em um expander
     with st.expander("📌 Entenda a confiabilidade da análise"):
         st.markdown("""
@@ -432,50 +502,50 @@ def display_confidence_by_rating(df):
         """)
     st.markdown("---")
 
-def display_sentiment_bubble_chart(df):
+@instrumented()
+def display_sentiment_bubble_chart(aggregates):
     st.subheader("🔮 Mapa de Sentimento (Confiança × Nota × Volume)")
-    
-    # Agrupar dados
-    grouped = df.groupby(['class_index', 'sentiment_class']).agg(
-        count=('sentiment_class', 'count'),
-        avg_confidence=('confidence_percent', 'mean')
-    ).reset_index()
-    
-    # Criar gráfico de bolhas
-    fig, ax = plt.subplots(figsize=(12, 8))
-    
-    # Definir cores por sentimento
-    colors = {'Positivo': 'green', 'Neutro': 'blue', 'Negativo': 'red'}
-    
-    # Plotar bolhas
-    for sentiment in grouped['sentiment_class'].unique():
-        subset = grouped[grouped['sentiment_class'] == sentiment]
-        scatter = ax.scatter(
-            subset['class_index'], 
-            subset['avg_confidence'],
-            s=subset['count']*20,  # Tamanho proporcional à contagem
-            alpha=0.6,
-            color=colors[sentiment],
-            label=sentiment
-        )
-    
-    # Adicionar textos
-    for _, row in grouped.iterrows():
-        ax.annotate(
-            f"{row['count']}",
-            (row['class_index'], row['avg_confidence']),
-            ha='center', va='center',
-            fontsize=9
-        )
-    
-    ax.set_title("Mapa de Sentimento: Nota vs Confiança vs Volume")
-    ax.set_xlabel("Nota")
-    ax.set_ylabel("Confiança Média (%)")
-    ax.set_xticks([1, 2, 3, 4, 5])
-    ax.legend(title="Sentimento")
-    ax.grid(True, alpha=0.3)
-    
-    st.pyplot(fig)
+
+    def draw():
+        # Contagem e confiança média por nota × sentimento (do cubo)
+        grouped = agg_views.group_summary(aggregates)
+
+        # Criar gráfico de bolhas
+        fig, ax = plt.subplots(figsize=(12, 8))
+
+        # Definir cores por sentimento
+        colors = {'Positivo': 'green', 'Neutro': 'blue', 'Negativo': 'red'}
+
+        # Plotar bolhas
+        for sentiment in grouped['sentiment_class'].unique():
+            subset = grouped[grouped['sentiment_class'] == sentiment]
+            scatter = ax.scatter(
+                subset['class_index'], 
+                subset['avg_confidence'],
+                s=subset['count']*20,  # Tamanho proporcional à contagem
+                alpha=0.6,
+                color=colors[sentiment],
+                label=sentiment
+            )
+
+        # Adicionar textos
+        for _, row in grouped.iterrows():
+            ax.annotate(
+                f"{row['count']}",
+                (row['class_index'], row['avg_confidence']),
+                ha='center', va='center',
+                fontsize=9
+            )
+
+        ax.set_title("Mapa de Sentimento: Nota vs Confiança vs Volume")
+        ax.set_xlabel("Nota")
+        ax.set_ylabel("Confiança Média (%)")
+        ax.set_xticks([1, 2, 3, 4, 5])
+        ax.legend(title="Sentimento")
+        ax.grid(True, alpha=0.3)
+        return fig
+
+    show_figure(("bubble_chart", figure_cache.aggregates_fingerprint(aggregates)), draw)
     
     # Explicação em um expander com linguagem simplificada
     with st.expander("📌 Como entender este gráfico de bolhas"):
@@ -523,40 +593,48 @@ def display_sentiment_bubble_chart(df):
         """)
     st.markdown("---")
 
-def display_theme_distributions(df):
+@instrumented()
+def display_theme_distributions(aggregates):
     st.subheader("🍕 Gráfico de Pizza - Temas em Reviews Negativas")
-    negative_theme_counts = clean_data_for_pie_chart(df, "Negativo", "themes")
+    aggregates_key = figure_cache.aggregates_fingerprint(aggregates)
+    negative_theme_counts = agg_views.theme_counts(aggregates, "Negativo", "themes")
     if not negative_theme_counts.empty:
         # Gráfico
-        fig, ax = plt.subplots()
-        ax.pie(
-            negative_theme_counts,
-            labels=negative_theme_counts.index,
-            autopct='%1.1f%%',
-            startangle=90,
-            colors=sns.color_palette("RdBu", len(negative_theme_counts))
-        )
-        ax.set_title("Distribuição dos Temas em Reviews Negativas")
-        ax.axis('equal')
-        st.pyplot(fig)
+        def draw_negative():
+            fig, ax = plt.subplots()
+            ax.pie(
+                negative_theme_counts,
+                labels=negative_theme_counts.index,
+                autopct='%1.1f%%',
+                startangle=90,
+                colors=sns.color_palette("RdBu", len(negative_theme_counts))
+            )
+            ax.set_title("Distribuição dos Temas em Reviews Negativas")
+            ax.axis('equal')
+            return fig
+
+        show_figure(("negative_themes_pie", aggregates_key), draw_negative)
     else:
         st.info("Nenhum tema negativo encontrado.")
 
     st.subheader("🍰 Gráfico de Pizza - Temas em Reviews Positivas")
-    positive_theme_counts = clean_data_for_pie_chart(df, "Positivo", "positive_themes")
+    positive_theme_counts = agg_views.theme_counts(aggregates, "Positivo", "positive_themes")
     if not positive_theme_counts.empty:
         # Gráfico
-        fig2, ax2 = plt.subplots()
-        ax2.pie(
-            positive_theme_counts,
-            labels=positive_theme_counts.index,
-            autopct='%1.1f%%',
-            startangle=90,
-            colors=sns.color_palette("YlGn", len(positive_theme_counts))
-        )
-        ax2.set_title("Distribuição dos Temas em Reviews Positivas")
-        ax2.axis('equal')
-        st.pyplot(fig2)
+        def draw_positive():
+            fig2, ax2 = plt.subplots()
+            ax2.pie(
+                positive_theme_counts,
+                labels=positive_theme_counts.index,
+                autopct='%1.1f%%',
+                startangle=90,
+                colors=sns.color_palette("YlGn", len(positive_theme_counts))
+            )
+            ax2.set_title("Distribuição dos Temas em Reviews Positivas")
+            ax2.axis('equal')
+            return fig2
+
+        show_figure(("positive_themes_pie", aggregates_key), draw_positive)
     else:
         st.info("Nenhum tema positivo encontrado.")
 
@@ -790,7 +868,8 @@ def display_theme_distributions(df):
 
     st.markdown("---")
 
-def display_review_samples(df):
+@instrumented()
+def display_review_samples(df, aggregates=None):
     st.subheader("📚 Samples por Combinação (Nota × Sentimento)")
     
     # Adiciona explicação em um expander
@@ -801,7 +880,7 @@ def display_review_samples(df):
         Aqui você encontra **exemplos reais de reviews** para cada combinação de nota e sentimento.
         
         - Cada expander mostra uma review diferente
-        - As reviews são escolhidas aleatoriamente do seu conjunto de dados
+        - As reviews são sorteadas do seu conjunto de dados com semente fixa: o mesmo conjunto mostra sempre os mesmos exemplos
         - Os alertas (⚠️❗) indicam possíveis inconsistências na análise
         
         ### Como usar estas amostras:
@@ -813,60 +892,44 @@ def display_review_samples(df):
 
     sample_dict = {}
 
-    # Heurística 1: Faixa flexível para correspondência nota × sentimento
-    def is_sentiment_reasonable(rating, sentiment):
-        if rating == 5:
-            return sentiment in ["Positivo", "Neutro"]
-        elif rating == 4:
-            return sentiment in ["Positivo", "Neutro"]
-        elif rating == 3:
-            return True  # zona cinzenta
-        elif rating == 2:
-            return sentiment in ["Negativo", "Neutro"]
-        elif rating == 1:
-            return sentiment in ["Negativo", "Neutro"]
-        return False
-
-    # Heurística 2: Confiança baixa
-    def is_low_confidence(confidence_percent):
-        return confidence_percent < 30
-
-    # Heurística 3: Discrepância entre nota e score de sentimento
-    def has_discrepancy(rating, sentiment_score):
-        if rating == 5 and sentiment_score < 0:
-            return True
-        elif rating == 1 and sentiment_score > 0:
-            return True
-        return False
-
-    for rating in sorted(df["class_index"].unique()):
-        for sentiment in ["Positivo", "Neutro", "Negativo"]:
-            subset = df[(df["class_index"] == rating) & (df["sentiment_class"] == sentiment)]
-            if not subset.empty:
-                example = subset.sample(1).iloc[0]
-
-                sentiment_score = example["sentiment_score"]
-                confidence = example["confidence_percent"]
-
-                observacoes = []
-
-                if is_low_confidence(confidence):
-                    observacoes.append("⚠️ Confiança baixa na classificação - Verifique se o texto condiz com a nota")
-                if not is_sentiment_reasonable(rating, sentiment):
-                    observacoes.append("❗ Sentimento inesperado para essa nota")
-                if has_discrepancy(rating, sentiment_score):
-                    observacoes.append("❗ Score de sentimento diverge da nota")
-
-                if not observacoes:
-                    observacoes.append("✅ Nenhuma anomalia detectada")
-
-                sample_dict[(rating, sentiment)] = {
-                    "title": example["review_title"],
-                    "text": example["review_text"][:300] + ("..." if len(example["review_text"]) > 300 else ""),
-                    "sentiment_score": sentiment_score,
-                    "confidence_percent": confidence,
-                    "observacoes": observacoes
-                }
+    # Uma review por grupo nota × sentimento, sorteada com semente fixa: o reservatório vem
+    # pronto dos agregados (O(grupos) por render); sem ele (ex.: amostra de um arquivo maior),
+    # o sorteio é refeito em uma passada sobre df
+    positions = None if aggregates is None else agg_views.sample_positions(aggregates, len(df))
+    if positions is None:
+        positions = agg_views.group_sample_positions(df)
+    examples = decode_text_columns(df.iloc[positions])
+
+    # Heurísticas de anomalia só para as reviews escolhidas (tabelas em rules.py)
+    unexpected = ~rules.evaluate_rule("reasonable", examples["class_index"], examples["sentiment_class"])
+    low_confidence = rules.low_confidence(examples["confidence_percent"])
+    discrepancy = rules.has_discrepancy(examples["class_index"], examples["sentiment_score"])
+
+    for k in range(len(examples)):
+        example = examples.iloc[k]
+        rating, sentiment = example["class_index"], example["sentiment_class"]
+        sentiment_score = example["sentiment_score"]
+        confidence = example["confidence_percent"]
+
+        observacoes = []
+
+        if low_confidence[k]:
+            observacoes.append("⚠️ Confiança baixa na classificação - Verifique se o texto condiz com a nota")
+        if unexpected[k]:
+            observacoes.append("❗ Sentimento inesperado para essa nota")
+        if discrepancy[k]:
+            observacoes.append("❗ Score de sentimento diverge da nota")
+
+        if not observacoes:
+            observacoes.append("✅ Nenhuma anomalia detectada")
+
+        sample_dict[(rating, sentiment)] = {
+            "title": example["review_title"],
+            "text": example["review_text"][:300] + ("..." if len(example["review_text"]) > 300 else ""),
+            "sentiment_score": sentiment_score,
+            "confidence_percent": confidence,
+            "observacoes": observacoes
+        }
 
     # Cria containers para organizar os expanders em colunas
     col1, col2, col3 = st.columns(3)
@@ -913,25 +976,79 @@ def display_review_samples(df):
 
 
 
-def display_negative_reviews(df):
+@instrumented()
+def display_negative_reviews(df, aggregates):
     st.subheader("🚨 Reviews Negativas Detectadas")
     negative_df = df[df["sentiment_class"] == "Negativo"]
-    if negative_df.empty:
+    negative_total = agg_views.sentiment_counts(aggregates).get("Negativo", 0)
+    if negative_total == 0:
         st.info("Nenhuma review negativa encontrada.")
     else:
-        st.write(f"Total: {len(negative_df)} de {len(df)} reviews ({(len(negative_df)/len(df))*100:.2f}%)")
-        st.dataframe(negative_df[["review_title", "review_text", "class_index"]], use_container_width=True)
+        st.write(f"Total: {negative_total} de {aggregates['rows']} reviews ({(negative_total/aggregates['rows'])*100:.2f}%)")
+        if len(negative_df) < negative_total:
+            st.caption(f"Exibindo as {len(negative_df)} reviews negativas da amostra carregada em memória.")
+        if arena_text_columns(negative_df) and len(negative_df) > MAX_ARENA_DISPLAY_ROWS:
+            st.caption(f"Exibindo as primeiras {MAX_ARENA_DISPLAY_ROWS} (textos lidos da arena em disco); "
+                       "use a busca para as demais.")
+            negative_df = negative_df.head(MAX_ARENA_DISPLAY_ROWS)
+        st.dataframe(decode_text_columns(negative_df)[["review_title", "review_text", "class_index"]], width="stretch")
 
     st.markdown("---")
 
-    # Calculando a porcentagem de reviews positivas e negativas
-    positive_percentage = (df["sentiment_class"] == "Positivo").mean() * 100
-    negative_percentage = (df["sentiment_class"] == "Negativo").mean() * 100
+# Busca nas reviews analisadas pelo índice invertido (search_index): termos, "frases exatas"
+# e filtros de nota, sentimento e tema, com resultados paginados
+def display_review_search(df, index):
+    st.subheader("🔎 Buscar Reviews")
+    query = st.text_input('Termos ou "frases exatas"', key="search_query", placeholder='battery "stopped working"')
+    col1, col2, col3 = st.columns(3)
+    ratings = col1.multiselect("Nota", rules.RATINGS, key="search_ratings")
+    sentiments = col2.multiselect("Sentimento", rules.SENTIMENTS, key="search_sentiments")
+    themes = col3.multiselect("Tema", [theme for _, theme in get_theme_registry()], key="search_themes")
+    if not (query.strip() or ratings or sentiments or themes):
+        st.caption("Digite termos ou escolha filtros para buscar entre as reviews analisadas.")
+        return
+
+    result = search(index, query, ratings, sentiments, themes)
+    if query.strip() and not result["phrases"]:
+        st.info("A consulta só tem palavras ignoradas na busca (stopwords, números ou pontuação).")
+        return
+    if result["total"] == 0:
+        st.info("Nenhuma review encontrada.")
+        return
+    # Nova busca com menos páginas que a página atual volta para a primeira
+    if st.session_state.get("search_page", 1) > result["pages"]:
+        st.session_state.search_page = 1
+    page = st.number_input(f"Página (de {result['pages']})", min_value=1, max_value=result["pages"], key="search_page")
+    if page > 1:
+        result = search(index, query, ratings, sentiments, themes, page=page - 1)
+
+    terms = ", ".join(" ".join(phrase) for phrase in result["phrases"])
+    st.caption(f"{result['total']} reviews encontradas" + (f" para: {terms}" if terms else ""))
+    st.dataframe(decode_text_columns(df.iloc[result["rows"]])[["review_title", "review_text", "class_index", "sentiment_class", "confidence_percent"]],
+                 width="stretch")
+
+# Resultados parciais durante a análise em blocos (percentuais e principais temas até agora)
+def display_partial_results(aggregates, top_n=3):
+    total_reviews = aggregates["rows"]
+    if total_reviews == 0:
+        return
+    sentiment_counts = agg_views.sentiment_counts(aggregates)
+    col1, col2, col3 = st.columns(3)
+    for col, (label, sentiment) in zip((col1, col2, col3), (("😃 Positivas", "Positivo"), ("😐 Neutras", "Neutro"), ("😟 Negativas", "Negativo"))):
+        count = sentiment_counts.get(sentiment, 0)
+        col.metric(label, f"{count / total_reviews * 100:.1f}%", f"{count} reviews", delta_color="off")
+
+    negative_themes = agg_views.theme_counts(aggregates, "Negativo", "themes").head(top_n)
+    positive_themes = agg_views.theme_counts(aggregates, "Positivo", "positive_themes").head(top_n)
+    col1, col2 = st.columns(2)
+    col1.markdown("**🔴 Principais temas negativos:** " + (", ".join(f"{theme} ({count})" for theme, count in negative_themes.items()) or "nenhum ainda"))
+    col2.markdown("**🟢 Principais temas positivos:** " + (", ".join(f"{theme} ({count})" for theme, count in positive_themes.items()) or "nenhum ainda"))
 
-def display_percentages(df):
+@instrumented()
+def display_percentages(aggregates):
     # Calcular porcentagens
-    sentiment_counts = df['sentiment_class'].value_counts()
-    total_reviews = len(df)
+    sentiment_counts = agg_views.sentiment_counts(aggregates)
+    total_reviews = aggregates["rows"]
     
     # Garantir que existem as categorias (se não existirem, definir como 0)
     positive_count = sentiment_counts.get('Positivo', 0)
@@ -1016,7 +1133,8 @@ def display_percentages(df):
     
     st.markdown("---")
 
-def display_model_performance_analysis(df):
+@instrumented()
+def display_model_performance_analysis(aggregates):
     st.subheader("🔍 Análise de Precisão Avançada do Modelo")
     
     # Explicação simplificada em um expander
@@ -1050,73 +1168,45 @@ def display_model_performance_analysis(df):
         **Valores bons**: Acima de 70% indicam um modelo confiável para análises de negócio
         """)
     
-    from sklearn.metrics import confusion_matrix, precision_score, recall_score, f1_score
-    import matplotlib.pyplot as plt
-    import seaborn as sns
-    import numpy as np
-    
-    # Criar categorização baseada na nota (class_index)
-    df['expected_sentiment'] = df['class_index'].apply(lambda x: 
-                                                      'Positivo' if x == 5 else 
-                                                      'Negativo' if x == 1 else 
-                                                      'Neutro')  # Tratando 2 e 4 como Neutro
-    
-    # Filtrar somente os casos com notas válidas
-    clear_df = df[df['class_index'].isin([1, 2, 4, 5])]
-
-    # Matriz de Confusão com cores mais intuitivas
-    cm = confusion_matrix(
-        clear_df['expected_sentiment'], 
-        clear_df['sentiment_class'],
-        labels=['Positivo', 'Neutro', 'Negativo']
-    )
-    
-    # Criar visualização mais clara da matriz
-    fig, ax = plt.subplots(figsize=(8, 6))
-    
-    # Calcular porcentagens por linha
-    row_sums = cm.sum(axis=1)
-    cm_percent = np.zeros_like(cm, dtype=float)
-    for i in range(len(row_sums)):
-        if row_sums[i] > 0:
-            cm_percent[i] = cm[i] / row_sums[i] * 100
-    
-    # Plotar heatmap com valores absolutos
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
-                xticklabels=['Positivo', 'Neutro', 'Negativo'],
-                yticklabels=['Positivo', 'Neutro', 'Negativo'],
-                linewidths=1, linecolor='white', ax=ax)
-    
-    # Adicionar porcentagens
-    for i in range(len(cm)):
-        for j in range(len(cm)):
-            if cm[i, j] > 0:
-                ax.text(j + 0.5, i + 0.7, f"({cm_percent[i, j]:.1f}%)", 
-                        ha="center", va="center", color="black", fontsize=9)
-    
-    ax.set_title('Matriz de Confusão: Esperado vs. Detectado', fontsize=14)
-    ax.set_xlabel('Sentimento Detectado pelo Modelo', fontsize=12)
-    ax.set_ylabel('Sentimento Esperado pela Nota', fontsize=12)
-    st.pyplot(fig)
-    
-    # Preparar dados binários para análise separada
-    binary_df = clear_df[clear_df['expected_sentiment'].isin(['Positivo', 'Negativo'])].copy()
-
-    # Métricas com Positivo como classe positiva
-    y_true_pos = binary_df['expected_sentiment'].map({'Positivo': 1, 'Negativo': 0})
-    y_pred_pos = binary_df['sentiment_class'].map({'Positivo': 1, 'Negativo': 0, 'Neutro': 0}).astype(int)
-
-    precision_pos = precision_score(y_true_pos, y_pred_pos)
-    recall_pos = recall_score(y_true_pos, y_pred_pos)
-    f1_pos = f1_score(y_true_pos, y_pred_pos)
-
-    # Métricas com Negativo como classe positiva
-    y_true_neg = binary_df['expected_sentiment'].map({'Negativo': 1, 'Positivo': 0})
-    y_pred_neg = binary_df['sentiment_class'].map({'Negativo': 1, 'Positivo': 0, 'Neutro': 0}).astype(int)
-
-    precision_neg = precision_score(y_true_neg, y_pred_neg)
-    recall_neg = recall_score(y_true_neg, y_pred_neg)
-    f1_neg = f1_score(y_true_neg, y_pred_neg)
+    # Matriz de Confusão (notas 1, 2, 4 e 5; 2 e 4 tratadas como Neutro) a partir do cubo
+    cm = agg_views.confusion_matrix(aggregates)
+    
+    def draw():
+        # Criar visualização mais clara da matriz
+        fig, ax = plt.subplots(figsize=(8, 6))
+
+        # Calcular porcentagens por linha
+        row_sums = cm.sum(axis=1)
+        cm_percent = np.zeros_like(cm, dtype=float)
+        for i in range(len(row_sums)):
+            if row_sums[i] > 0:
+                cm_percent[i] = cm[i] / row_sums[i] * 100
+
+        # Plotar heatmap com valores absolutos
+        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
+                    xticklabels=['Positivo', 'Neutro', 'Negativo'],
+                    yticklabels=['Positivo', 'Neutro', 'Negativo'],
+                    linewidths=1, linecolor='white', ax=ax)
+
+        # Adicionar porcentagens
+        for i in range(len(cm)):
+            for j in range(len(cm)):
+                if cm[i, j] > 0:
+                    ax.text(j + 0.5, i + 0.7, f"({cm_percent[i, j]:.1f}%)", 
+                            ha="center", va="center", color="black", fontsize=9)
+
+        ax.set_title('Matriz de Confusão: Esperado vs. Detectado', fontsize=14)
+        ax.set_xlabel('Sentimento Detectado pelo Modelo', fontsize=12)
+        ax.set_ylabel('Sentimento Esperado pela Nota', fontsize=12)
+        return fig
+
+    # A matriz depende só das contagens: ela mesma serve de chave
+    show_figure(("confusion_matrix", cm.tobytes()), draw)
+    
+    # Métricas binárias das notas 1 e 5 (Positivo e Negativo como classe positiva)
+    metrics = agg_views.model_metrics(aggregates)
+    precision_pos, recall_pos, f1_pos = (metrics["Positivo"][key] for key in ("precision", "recall", "f1"))
+    precision_neg, recall_neg, f1_neg = (metrics["Negativo"][key] for key in ("precision", "recall", "f1"))
 
     # Criar cards mais visuais para as métricas
     st.markdown("### Desempenho do Modelo")
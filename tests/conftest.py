@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Os módulos ficam em src/ e são importados pelo nome (como em python src/cli.py)
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from aggregates import (empty_aggregates, build_aggregates, merge_aggregates, group_sample_positions,
+                        sample_positions, sample_keys)
+from rules import SENTIMENTS
+
+def analyzed_frame(n, seed=7):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        # Notas/sentimentos fora das tabelas ficam sem grupo
+        "class_index": rng.choice([1, 2, 3, 4, 5, 0], n),
+        "sentiment_class": rng.choice(SENTIMENTS + ["?"], n),
+        "sentiment_score": rng.uniform(-1, 1, n).round(4),
+        "confidence_percent": rng.uniform(0, 100, n).round(2),
+    })
+
+def chunked_aggregates(df, chunk_rows):
+    agg = empty_aggregates()
+    for start in range(0, len(df), chunk_rows):
+        agg = merge_aggregates(agg, build_aggregates(df.iloc[start:start + chunk_rows], row_offset=start))
+    return agg
+
+def test_sample_keys_follow_row_positions():
+    assert np.array_equal(sample_keys(1234, 500), np.random.default_rng(42).random(2000)[1234:1734])
+
+def test_reservoir_matches_full_pass_across_chunks():
+    df = analyzed_frame(20_000)
+    expected = group_sample_positions(df)
+    whole = build_aggregates(df)
+    assert np.array_equal(sample_positions(whole, len(df)), expected)
+    for chunk_rows in (1, 997, 5_000):
+        agg = chunked_aggregates(df.iloc[:3_000] if chunk_rows == 1 else df, chunk_rows)
+        rows = agg["rows"]
+        assert np.array_equal(sample_positions(agg, rows), group_sample_positions(df.iloc[:rows]))
+        if rows == len(df):
+            # Somas de float só diferem pela ordem das parcelas
+            for key in whole:
+                assert np.allclose(agg[key], whole[key]), key
+
+def test_reservoir_only_describes_the_analyzed_frame():
+    df = analyzed_frame(1_000)
+    agg = build_aggregates(df)
+    # Amostra de um dataset maior: os agregados não apontam para as linhas dela
+    assert sample_positions(agg, 500) is None
+    # Agregados sem reservatório (ex.: calculados no banco)
+    stored = empty_aggregates()
+    stored["rows"] = len(df)
+    stored["counts"] = agg["counts"]
+    assert sample_positions(stored, len(df)) is None
+    assert sample_positions(empty_aggregates(), 0).size == 0
@@ -0,0 +1,100 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from api_client import fetch_page, fetch_range, create_session, REVIEW_COLUMNS
+
+# Servidor local no formato da API de linhas do HuggingFace ({"rows": [{"row": {...}}]}).
+# Por offset, o teste pode injetar respostas de erro (status devolvidos antes do sucesso)
+# e atrasos (segundos de espera de cada tentativa, para provocar timeouts).
+class FakeRowsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        query = parse_qs(urlparse(self.path).query)
+        offset, limit = int(query["offset"][0]), int(query["limit"][0])
+        with server.lock:
+            server.requests.append((offset, time.monotonic()))
+            status = server.failures.get(offset, []).pop(0) if server.failures.get(offset) else 200
+            delay = server.delays.get(offset, []).pop(0) if server.delays.get(offset) else 0
+        time.sleep(delay)
+        if status != 200:
+            body = b"{}"
+        else:
+            body = json.dumps({"rows": [
+                {"row_idx": i, "row": {"class_index": i % 5 + 1, "review_title": f"title {i}",
+                                       "review_text": f"review {i}"}}
+                for i in range(offset, offset + limit)
+            ]}).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def api():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeRowsHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = []
+    server.failures = {}
+    server.delays = {}
+    server.url = f"http://127.0.0.1:{server.server_port}/rows"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def attempts(server, offset):
+    return [moment for requested, moment in server.requests if requested == offset]
+
+def test_fetch_range_keeps_offset_order(api):
+    # Primeiras páginas mais lentas: terminam depois das seguintes
+    api.delays = {0: [0.3], 100: [0.2], 200: [0.1]}
+    df = fetch_range(0, 450, max_workers=5, base_url=api.url, backoff=0.01)
+    assert list(df.columns) == REVIEW_COLUMNS
+    assert df["review_text"].tolist() == [f"review {i}" for i in range(450)]
+    assert sorted(offset for offset, _ in api.requests) == [0, 100, 200, 300, 400]
+
+def test_retries_429_and_503_with_exponential_backoff(api):
+    api.failures = {100: [429, 503]}
+    df = fetch_range(0, 300, max_workers=3, base_url=api.url, backoff=0.1)
+    assert df["review_text"].tolist() == [f"review {i}" for i in range(300)]
+    retried = attempts(api, 100)
+    assert len(retried) == 3
+    # backoff * 2**tentativa: 0.1 s e depois 0.2 s
+    assert retried[1] - retried[0] >= 0.1
+    assert retried[2] - retried[1] >= 0.2
+    assert len(attempts(api, 0)) == len(attempts(api, 200)) == 1
+
+def test_timeout_is_retried(api):
+    api.delays = {0: [1.0]}
+    with create_session() as session:
+        records = fetch_page(session, 0, 10, base_url=api.url, timeout=0.2, backoff=0.01)
+    assert [record["review_text"] for record in records] == [f"review {i}" for i in range(10)]
+    assert len(attempts(api, 0)) == 2
+
+def test_exhausted_retries_raise(api):
+    api.failures = {0: [503] * 10}
+    with create_session() as session:
+        with pytest.raises(requests.HTTPError):
+            fetch_page(session, 0, 10, base_url=api.url, max_retries=2, backoff=0.01)
+    assert len(attempts(api, 0)) == 3
+
+def test_exhausted_retries_on_timeout_raise(api):
+    api.delays = {0: [1.0] * 10}
+    with pytest.raises(requests.Timeout):
+        fetch_range(0, 10, base_url=api.url, timeout=0.2, max_retries=1, backoff=0.01)
+    assert len(attempts(api, 0)) == 2
@@ -0,0 +1,38 @@
+import os
+
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+import data_loader
+from api_client import REVIEW_COLUMNS
+from conftest import SRC_DIR
+
+def labeled(widgets, text):
+    return [widget for widget in widgets if text in widget.label][0]
+
+# Interface com a API substituída por um falso fetch_range que registra os intervalos pedidos
+def test_load_more_continues_after_the_loaded_rows(monkeypatch):
+    requested = []
+
+    def fake_fetch_range(start, stop):
+        requested.append((start, stop))
+        return pd.DataFrame([{"review_title": f"t{i}", "review_text": f"review {i}", "class_index": i % 5 + 1}
+                             for i in range(start, stop)], columns=REVIEW_COLUMNS)
+
+    monkeypatch.setattr(data_loader, "fetch_range", fake_fetch_range)
+    monkeypatch.chdir(SRC_DIR)
+    at = AppTest.from_file(os.path.join(SRC_DIR, "main.py"), default_timeout=60)
+    at.run()
+    # Primeiro download a partir do offset 100, em lotes de 5.000 linhas
+    at.session_state["api_offset_input"] = 100
+    at.session_state["api_limit_input"] = 5_000
+    labeled(at.radio, "fonte dos dados").set_value("API HuggingFace").run()
+    labeled(at.radio, "usando a API").set_value("Sim").run()
+    labeled(at.button, "Carregar mais").click().run()
+    labeled(at.button, "Carregar mais").click().run()
+
+    assert not at.exception
+    assert requested == [(100, 5_100), (5_100, 10_100), (10_100, 15_100)]
+    texts = at.session_state.df_reviews["review_text"]
+    assert texts.tolist() == [f"review {i}" for i in range(100, 15_100)]
+    assert at.session_state.offset == 15_100
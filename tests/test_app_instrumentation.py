@@ -0,0 +1,36 @@
+import os
+
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+import data_loader
+from api_client import REVIEW_COLUMNS
+from conftest import SRC_DIR
+
+def labeled(widgets, text):
+    return [widget for widget in widgets if text in widget.label][0]
+
+def panel_stages(at):
+    return [stage.strip() for stage in at.sidebar.dataframe[0].value["stage"]]
+
+# Com a medição ligada, o painel da barra lateral mostra as etapas do carregamento e do "Carregar mais"
+def test_loading_stages_show_in_the_panel(monkeypatch):
+    def fake_fetch_range(start, stop):
+        return pd.DataFrame([{"review_title": f"t{i}", "review_text": f"review {i}", "class_index": i % 5 + 1}
+                             for i in range(start, stop)], columns=REVIEW_COLUMNS)
+
+    monkeypatch.setattr(data_loader, "fetch_range", fake_fetch_range)
+    monkeypatch.chdir(SRC_DIR)
+    at = AppTest.from_file(os.path.join(SRC_DIR, "main.py"), default_timeout=60)
+    at.run()
+    labeled(at.sidebar.checkbox, "Medir desempenho").check().run()
+    assert not at.sidebar.dataframe
+
+    labeled(at.radio, "fonte dos dados").set_value("API HuggingFace").run()
+    assert not at.exception
+    assert panel_stages(at) == ["fetch_from_api"]
+
+    labeled(at.radio, "usando a API").set_value("Sim").run()
+    labeled(at.button, "Carregar mais").click().run()
+    assert not at.exception
+    assert panel_stages(at) == ["fetch_from_api"]
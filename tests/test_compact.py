@@ -0,0 +1,14 @@
+import numpy as np
+import pandas as pd
+
+from compact import compact_reviews
+
+def test_scores_keep_float64_values():
+    df = pd.DataFrame({"class_index": [1, 5], "sentiment_class": ["Negativo", "Positivo"],
+                       "sentiment_score": [0.4019, -0.2755], "confidence_percent": [40.19, 27.55]})
+    compact = compact_reviews(df.copy())
+    assert compact["sentiment_score"].dtype == np.float64
+    assert compact["confidence_percent"].dtype == np.float64
+    assert compact["sentiment_score"].tolist() == [0.4019, -0.2755]
+    assert compact["confidence_percent"].tolist() == [40.19, 27.55]
+    assert compact["class_index"].dtype == np.int8
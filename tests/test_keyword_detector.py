@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from keyword_detector import (detect_keywords, get_negative_keywords, get_positive_keywords, decode_theme_masks,
+                              match_theme_mask, match_theme_mask_tokens, theme_masks, detect_themes)
+from preprocessor import preprocess_series, tokenize_series, iter_token_ids
+
+# Palavras-chave sobrepostas ("unresponsive" contém "responsive") e repetidas em dois temas ("durable")
+TEXTS = [
+    "",
+    "unresponsive",
+    "responsive",
+    "not responsive at all, totally unresponsive support",
+    "durable",
+    "very durable and well made",
+    "it stopped working after a week, poor quality",
+    "responsivedurable",
+    "long-lasting battery but doesn't meet expectations",
+    "the product is fine",
+]
+
+def reference(text):
+    return {"themes": detect_keywords(text, get_negative_keywords()),
+            "positive_themes": detect_keywords(text, get_positive_keywords())}
+
+def decoded(mask):
+    columns = decode_theme_masks([mask])
+    return {column: names[0] for column, names in columns.items()}
+
+# Textos sorteados a partir de palavras-chave, pedaços delas e palavras comuns, colados
+# com e sem espaço, para provocar casamentos parciais e sobreposições
+def random_texts(count=1_000, seed=7):
+    rng = np.random.default_rng(seed)
+    keywords = [keyword for themes in (get_negative_keywords(), get_positive_keywords())
+                for keywords in themes.values() for keyword in keywords]
+    fillers = ["the", "product", "works", "not", "very", "un", "ly", "at", "all", "great"]
+    texts = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.integers(1, 8)):
+            choice = rng.random()
+            if choice < 0.4:
+                parts.append(keywords[rng.integers(len(keywords))])
+            elif choice < 0.7:
+                keyword = keywords[rng.integers(len(keywords))]
+                start, stop = sorted(rng.integers(0, len(keyword) + 1, 2))
+                parts.append(keyword[start:stop])
+            else:
+                parts.append(fillers[rng.integers(len(fillers))])
+        texts.append("".join(part + (" " if rng.random() < 0.7 else "") for part in parts))
+    return texts
+
+def test_examples_cover_overlaps_and_shared_keywords():
+    assert reference("unresponsive")["positive_themes"]
+    assert reference("unresponsive")["themes"]
+    assert len(reference("durable")["positive_themes"]) == 2
+
+def test_automaton_matches_keyword_loop():
+    for text in TEXTS + random_texts():
+        assert decoded(match_theme_mask(text)) == reference(text), text
+
+def test_token_automaton_matches_keyword_loop_on_clean_text():
+    texts = pd.Series(TEXTS + random_texts())
+    clean_text, tokens = tokenize_series(texts, chunk_size=97)
+    memo = {}
+    for text, token_ids in zip(clean_text, iter_token_ids(tokens, chunk_rows=50)):
+        assert decoded(match_theme_mask_tokens(token_ids, tokens["vocab"], memo)) == reference(text), text
+
+def test_theme_columns_match_with_and_without_tokens():
+    df = pd.DataFrame({"review_text": TEXTS + random_texts(300, seed=11)})
+    df["clean_text"], tokens = tokenize_series(df["review_text"])
+    assert df["clean_text"].tolist() == preprocess_series(df["review_text"]).tolist()
+    assert theme_masks(df["clean_text"], tokens).tolist() == theme_masks(df["clean_text"]).tolist()
+    themes = detect_themes(df.copy(), tokens)
+    expected = [reference(text) for text in df["clean_text"]]
+    assert themes["themes"].tolist() == [names["themes"] for names in expected]
+    assert themes["positive_themes"].tolist() == [names["positive_themes"] for names in expected]
@@ -0,0 +1,15 @@
+import pandas as pd
+
+from preprocessor import preprocess_text, preprocess_series, tokenize_series, iter_token_ids
+
+TEXTS = pd.Series(["This is NOT the product I ordered!!", "", "Great   value, works fine... 10/10",
+                   "the and of", "Stopped working after 2 weeks; stopped WORKING again"])
+
+def test_series_and_stream_match_preprocess_text():
+    expected = [preprocess_text(text) for text in TEXTS]
+    assert preprocess_series(TEXTS, chunk_size=2).tolist() == expected
+    clean_text, tokens = tokenize_series(TEXTS, chunk_size=2)
+    assert clean_text.tolist() == expected
+    words = [" ".join(tokens["vocab"][token_id] for token_id in ids)
+             for ids in iter_token_ids(tokens, chunk_rows=2)]
+    assert words == expected
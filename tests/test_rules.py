@@ -0,0 +1,117 @@
+import itertools
+import timeit
+
+import numpy as np
+import pandas as pd
+
+import rules
+from sentiment_analyzer import calculate_precision
+
+# Regras por linha da versão original (sentiment_analyzer e display_review_samples), usadas
+# como referência para o motor de regras em tabelas
+def reference_classify(score):
+    if score < 0.52:
+        return "Negativo"
+    elif score > 0.67:
+        return "Positivo"
+    else:
+        return "Neutro"
+
+def reference_precision(df):
+    def is_correct_prediction(row):
+        predicted = row["sentiment_class"]
+        real = row["class_index"]
+        if real == 1:
+            return predicted == "Negativo"
+        elif real == 2:
+            return predicted in ["Negativo", "Neutro"]
+        elif real == 3:
+            return predicted in ["Negativo", "Neutro", "Positivo"]
+        elif real == 4:
+            return predicted in ["Positivo", "Neutro"]
+        elif real == 5:
+            return predicted == "Positivo"
+        return False
+    return df.apply(is_correct_prediction, axis=1).mean()
+
+def reference_limited(rating, sentiment):
+    if rating == 1 and sentiment == "Negativo":
+        return True
+    if rating == 5 and sentiment == "Positivo":
+        return True
+    if rating == 4 and sentiment in {"Positivo", "Neutro"}:
+        return True
+    if rating == 2 and sentiment in {"Negativo", "Neutro"}:
+        return True
+    return False
+
+def reference_reasonable(rating, sentiment):
+    if rating == 5:
+        return sentiment in ["Positivo", "Neutro"]
+    elif rating == 4:
+        return sentiment in ["Positivo", "Neutro"]
+    elif rating == 3:
+        return True
+    elif rating == 2:
+        return sentiment in ["Negativo", "Neutro"]
+    elif rating == 1:
+        return sentiment in ["Negativo", "Neutro"]
+    return False
+
+def reference_low_confidence(confidence_percent):
+    return confidence_percent < 30
+
+def reference_discrepancy(rating, sentiment_score):
+    if rating == 5 and sentiment_score < 0:
+        return True
+    elif rating == 1 and sentiment_score > 0:
+        return True
+    return False
+
+# Notas válidas, fora da faixa, não inteiras e ausentes; sentimentos conhecidos, ausentes e desconhecidos
+RATINGS = [1, 2, 3, 4, 5, 0, 6, -1, 2.5, 3.0, np.nan]
+SENTIMENTS = ["Positivo", "Neutro", "Negativo", np.nan, "Outro"]
+SCORES = [-1.0, -0.3, -0.0, 0.0, 0.3, 0.52, 0.5200001, 0.6, 0.67, 0.6700001, 1.0, np.nan]
+
+def combinations():
+    rows = list(itertools.product(RATINGS, SENTIMENTS, SCORES))
+    df = pd.DataFrame(rows, columns=["class_index", "sentiment_class", "sentiment_score"])
+    df["confidence_percent"] = (df["sentiment_score"].abs() * 100).round(2)
+    return df
+
+def test_classify_sentiments_matches_row_rule():
+    scores = combinations()["sentiment_score"]
+    assert rules.classify_sentiments(scores).tolist() == [reference_classify(score) for score in scores]
+
+def test_rating_rules_match_row_rules():
+    df = combinations()
+    pairs = list(zip(df["class_index"], df["sentiment_class"]))
+    limited = rules.evaluate_rule("limited", df["class_index"], df["sentiment_class"])
+    reasonable = rules.evaluate_rule("reasonable", df["class_index"], df["sentiment_class"])
+    assert limited.tolist() == [reference_limited(*pair) for pair in pairs]
+    assert reasonable.tolist() == [reference_reasonable(*pair) for pair in pairs]
+
+def test_precision_matches_row_rule():
+    df = combinations()
+    assert calculate_precision(df) == reference_precision(df)
+    for subset in (df[df["class_index"] == 3], df[df["class_index"].isna()], df.iloc[:7]):
+        assert calculate_precision(subset) == reference_precision(subset)
+
+def test_anomaly_heuristics_match_row_rules():
+    df = combinations()
+    assert rules.low_confidence(df["confidence_percent"]).tolist() == \
+        [reference_low_confidence(value) for value in df["confidence_percent"]]
+    assert rules.has_discrepancy(df["class_index"], df["sentiment_score"]).tolist() == \
+        [reference_discrepancy(rating, score) for rating, score in zip(df["class_index"], df["sentiment_score"])]
+
+def test_precision_is_at_least_50x_faster_than_row_apply():
+    rng = np.random.default_rng(0)
+    n_rows = 50_000
+    df = pd.DataFrame({
+        "class_index": rng.integers(1, 6, n_rows).astype(np.int8),
+        "sentiment_class": pd.Categorical(rng.choice(rules.SENTIMENTS, n_rows), categories=rules.SENTIMENTS),
+    })
+    assert calculate_precision(df) == reference_precision(df)
+    row_seconds = min(timeit.repeat(lambda: reference_precision(df), number=1, repeat=2))
+    table_seconds = min(timeit.repeat(lambda: calculate_precision(df), number=1, repeat=5))
+    assert row_seconds / table_seconds >= 50
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from keyword_detector import THEME_MASK_COLUMN
+from search_index import build_index, build_index_in_chunks, search
+
+CLEAN_TEXTS = [
+    "charger stopped working",       # 0
+    "battery died fast",             # 1: "working battery" atravessaria o limite 0 | 1
+    "stopped",                       # 2: "stopped working" atravessaria o limite 2 | 3
+    "working great battery",         # 3
+    "battery stopped working again", # 4
+    "stopped working stopped working",
+]
+
+def reviews():
+    return pd.DataFrame({
+        "clean_text": CLEAN_TEXTS,
+        "class_index": [1, 2, 1, 5, 1, 2],
+        "sentiment_class": ["Negativo", "Negativo", "Neutro", "Positivo", "Negativo", "Negativo"],
+        THEME_MASK_COLUMN: np.zeros(len(CLEAN_TEXTS), dtype=np.uint32),
+    })
+
+def indexes():
+    df = reviews()
+    single = [build_index(df)]
+    # Segmentos de 2 e de 3 linhas: os limites caem entre as reviews 1|2, 3|4 e 2|3
+    return {"single": single, "pairs": build_index_in_chunks(df, chunk_rows=2),
+            "triples": build_index_in_chunks(df, chunk_rows=3)}
+
+def rows(index, query, **filters):
+    return search(index, query, page_size=100, **filters)["rows"].tolist()
+
+def test_phrases_match_across_segments_with_global_rows():
+    for name, index in indexes().items():
+        assert rows(index, '"stopped working"') == [0, 4, 5], name
+        assert rows(index, "battery") == [1, 3, 4], name
+        assert rows(index, 'battery "stopped working"') == [4], name
+        assert rows(index, '"stopped working"', ratings=[2]) == [5], name
+
+def test_phrases_do_not_cross_review_or_segment_boundaries():
+    for name, index in indexes().items():
+        assert rows(index, '"working battery"') == [], name
+        assert rows(index, '"died fast stopped"') == [], name
+        assert rows(index, '"working great battery"') == [3], name
+
+def test_query_of_only_stopwords_finds_nothing():
+    for name, index in indexes().items():
+        result = search(index, "the")
+        assert result["total"] == 0 and result["phrases"] == [], name
+        assert search(index, '"of the" 123 !!')["total"] == 0, name
+        # Sem consulta, só os filtros valem
+        assert search(index, "", ratings=[1])["total"] == 3, name
@@ -0,0 +1,23 @@
+import pandas as pd
+import pytest
+
+from preprocessor import tokenize_series
+from sentiment_analyzer import analyze_sentiment
+
+REVIEWS = pd.DataFrame({
+    "review_text": ["I love it, works great", "Terrible, stopped working", "I love it, works great", "It is ok"],
+    "class_index": [5, 1, 4, 3],
+})
+
+def test_preprocessed_reuses_clean_text():
+    expected, expected_precision = analyze_sentiment(REVIEWS.copy())
+    df = REVIEWS.copy()
+    df["clean_text"], _ = tokenize_series(df["review_text"])
+    result, precision = analyze_sentiment(df, preprocessed=True)
+    pd.testing.assert_frame_equal(result, expected)
+    assert precision == expected_precision
+    assert result.attrs["duplicate_rows"] == 1
+
+def test_preprocessed_without_clean_text_raises():
+    with pytest.raises(ValueError):
+        analyze_sentiment(REVIEWS.copy(), preprocessed=True)
@@ -0,0 +1,44 @@
+import json
+import subprocess
+import sys
+
+from conftest import SRC_DIR
+
+# Tempo máximo para importar o preprocessor (na máquina de referência leva ~1 ms)
+IMPORT_BUDGET_SECONDS = 0.5
+
+# Em um processo novo, com a rede bloqueada: a importação não pode baixar recursos do NLTK
+# nem importar o nltk, e a primeira limpeza de texto usa só o snapshot local.
+STARTUP_SCRIPT = """
+import json, socket, sys, time
+
+def blocked(*args, **kwargs):
+    raise OSError("acesso à rede bloqueado no teste")
+
+socket.socket = blocked
+socket.create_connection = blocked
+
+start = time.perf_counter()
+import preprocessor
+import_seconds = time.perf_counter() - start
+nltk_after_import = "nltk" in sys.modules
+clean = preprocessor.preprocess_text("This is NOT the product I ordered!!")
+print(json.dumps({"import_seconds": import_seconds, "nltk_after_import": nltk_after_import,
+                  "nltk_after_preprocess": "nltk" in sys.modules, "clean": clean}))
+"""
+
+def run_startup():
+    result = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=SRC_DIR,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout)
+
+def test_import_is_fast_and_offline():
+    startup = run_startup()
+    assert startup["import_seconds"] < IMPORT_BUDGET_SECONDS
+    assert not startup["nltk_after_import"]
+
+def test_preprocess_uses_local_snapshot():
+    startup = run_startup()
+    assert startup["clean"] == "product ordered"
+    assert not startup["nltk_after_preprocess"]
@@ -0,0 +1,65 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+import text_arena
+from text_arena import (open_arena, arena_path, arena_index_dir, remove_stale_arenas, touch_arena,
+                        store_text_columns, decode_text_columns)
+from benchmark import make_synthetic_reviews
+from pipeline import analyze_reviews
+from search_index import build_index_in_chunks, search
+
+def make_arena(arena_dir, source="reviews.csv"):
+    arena = open_arena(arena_path(source, arena_dir=str(arena_dir)))
+    arena.append(["texto"])
+    os.makedirs(arena_index_dir(arena.path))
+    return arena
+
+def age(path, seconds):
+    moment = time.time() - seconds
+    os.utime(path, (moment, moment))
+
+def test_arena_path_is_unique_per_run_and_source(tmp_path):
+    first = arena_path("a/reviews.csv", arena_dir=str(tmp_path))
+    assert first != arena_path("a/reviews.csv", arena_dir=str(tmp_path))
+    assert arena_path("a/reviews.csv", "run", str(tmp_path)) != arena_path("b/reviews.csv", "run", str(tmp_path))
+
+def test_stale_arenas_are_removed_and_closed(tmp_path):
+    stale = make_arena(tmp_path)
+    live = make_arena(tmp_path)
+    age(stale.path, text_arena.ARENA_MAX_AGE_SECONDS + 60)
+    age(live.path, text_arena.ARENA_MAX_AGE_SECONDS + 60)
+    touch_arena(live.path)
+    orphan = os.path.join(tmp_path, "sem-arena.arena.index")
+    os.makedirs(orphan)
+
+    assert remove_stale_arenas(str(tmp_path)) == [stale.path]
+    assert not os.path.exists(stale.path)
+    assert not os.path.exists(arena_index_dir(stale.path))
+    assert not os.path.exists(orphan)
+    assert stale.path not in text_arena._arenas
+    assert os.path.exists(live.path) and os.path.exists(arena_index_dir(live.path))
+    live.close()
+
+@pytest.fixture(scope="module")
+def analyzed():
+    df, _ = analyze_reviews(make_synthetic_reviews(3_000), compact=True)
+    return df
+
+@pytest.mark.parametrize("query", ['"stopped working"', "battery", "great product", '"waste money"', "xyzzy"])
+def test_index_on_disk_matches_memory(tmp_path, analyzed, query):
+    df = analyzed.copy()
+    arena = open_arena(arena_path("reviews.csv", arena_dir=str(tmp_path)))
+    stored = store_text_columns(df, arena)
+    memory = build_index_in_chunks(stored, chunk_rows=700)
+    disk = build_index_in_chunks(stored, chunk_rows=700, directory=arena_index_dir(arena.path))
+    assert isinstance(disk[0]["positions"], np.memmap)
+    for filters in ({}, {"ratings": [1, 2]}, {"sentiments": ["Negativo"]}):
+        expected = search(memory, query, page_size=len(df), **filters)
+        found = search(disk, query, page_size=len(df), **filters)
+        assert found["total"] == expected["total"]
+        assert found["rows"].tolist() == expected["rows"].tolist()
+    assert decode_text_columns(stored.iloc[:3])["review_text"].tolist() == df["review_text"].iloc[:3].tolist()
+    arena.close()